@@ -0,0 +1,596 @@
+# Aggregates behind the 'Data Analytics' page. Everything the tabs show
+# (outcome counts, correlation matrices, crosstabs, age-group rates, histogram
+# bins and a bounded scatter sample) is derived from a running accumulator
+# and kept in memory, so switching pages only reads the results.
+#
+# The accumulator state is persisted in dataset/.cache/<name>.aggregates.npz
+# together with the byte offset of the CSV it has consumed. When the file
+# grows, only the rows after that offset are parsed and absorbed, so the page
+# follows a file that is being appended to in time proportional to the new
+# rows. A sampled fingerprint of the consumed bytes detects files that were
+# rewritten rather than appended to, which are aggregated again from scratch.
+# A full rebuild reads the dataset through datasets.load_dataset, i.e. the
+# column-pruned Arrow cache when pyarrow is available, instead of parsing
+# the CSV text; appended rows are parsed from their byte range.
+#
+#   python analytics.py              # bring the stored aggregates up to date
+#   python analytics.py --rebuild heart
+
+import argparse
+import collections
+import copy
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+import datasets
+import metrics
+
+AGE_HISTOGRAM_BINS = 15
+SCATTER_SAMPLE_ROWS = 5000
+STREAM_CHUNK_ROWS = 100000
+
+STORE_FORMAT = 2
+# Size and number of the blocks hashed to fingerprint the consumed bytes
+FINGERPRINT_BLOCK = 65536
+FINGERPRINT_BLOCKS = 16
+
+COMPUTE_SECONDS = metrics.histogram('analytics_compute_seconds', 'Time to compute the aggregates of one dataset', ('dataset',))
+ABSORBED_ROWS = metrics.counter('analytics_absorbed_rows_total',
+                                'Rows absorbed into the stored aggregates, by full rebuild or append',
+                                ('dataset', 'mode'))
+
+logger = logging.getLogger('health.analytics')
+
+# Patients to aggregate: an inclusive age range and a sex value, None for no
+# limit. The sex is ignored for datasets without a sex column.
+Cohort = collections.namedtuple('Cohort', ['age_min', 'age_max', 'sex'], defaults=(None, None, None))
+ALL_PATIENTS = Cohort()
+
+# Filtered aggregates kept per process, most recently used last
+COHORT_CACHE_SIZE = 64
+
+_cache = {}
+_cohort_cache = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+def normalize_cohort(name, cohort):
+    cohort = ALL_PATIENTS if cohort is None else Cohort(*cohort)
+    if 'sex' not in datasets.DATASETS[name]:
+        cohort = cohort._replace(sex=None)
+    return cohort
+
+
+# Running state behind the aggregates, updated one chunk at a time so a file
+# of any size can be summarized in bounded memory. Rows are grouped into
+# cells by (age, sex) (sex is None for datasets without it), and each cell
+# keeps:
+#   - its row count, column means and co-moment matrix, merged across chunks
+#     and across cells with Chan et al.'s pairwise update, for correlations
+#   - its row count per outcome, from which outcome counts, the age
+#     histogram, age-group rates and sex crosstabs are derived
+# A uniform sample of the scatter columns is kept as the rows with the
+# smallest random keys seen so far. Rows with missing values are skipped and
+# counted.
+#
+# The cells are the index behind cohort filters: result(cohort) merges only
+# the cells inside the age range and sex, so a filtered view costs the same
+# as the unfiltered one whatever the number of rows.
+class AggregateAccumulator:
+
+    def __init__(self, name, sample_rows=SCATTER_SAMPLE_ROWS, seed=42):
+        self.name = name
+        self.config = datasets.DATASETS[name]
+        self.sample_rows = sample_rows
+        self.rng = np.random.default_rng(seed)
+        self.columns = None
+        self.rows = 0
+        self.skipped_rows = 0
+        # (age, sex) -> (rows, mean, comoment)
+        self.cells = {}
+        # (age, sex, outcome) -> rows
+        self.counts = {}
+        self.sample = None
+        self._index = None
+
+    def _key_columns(self):
+        return [self.config['age']] + ([self.config['sex']] if 'sex' in self.config else [])
+
+    # df is a dataset view or a raw chunk with the same columns
+    def update(self, df):
+        target = self.config['target']
+        required = [target] + self._key_columns() + self.config.get('scatter_columns', [])
+        missing = sorted({c for c in required if c not in df.columns})
+        if missing:
+            raise ValueError(f"Missing columns for {self.name} analytics: {', '.join(missing)}")
+        if self.columns is None:
+            self.columns = [c for c in df.columns
+                            if c != datasets.AGE_GROUP and pd.api.types.is_numeric_dtype(df[c])]
+
+        complete = df[self.columns].notna().all(axis=1).to_numpy()
+        if not complete.all():
+            self.skipped_rows += int((~complete).sum())
+            df = df[complete]
+        if not len(df):
+            return self
+
+        X = df[self.columns].to_numpy(dtype=np.float64)
+        key_columns = self._key_columns()
+        for key, positions in df.groupby(key_columns, sort=False).indices.items():
+            key = self._cell_key(key if isinstance(key, tuple) else (key,))
+            Xc = X[positions]
+            mean = Xc.mean(axis=0)
+            centered = Xc - mean
+            self.cells[key] = _merge_moments(self.cells.get(key), (len(Xc), mean, centered.T @ centered))
+
+        for key, count in df.groupby(key_columns + [target], sort=False).size().items():
+            key = self._cell_key(key[:-1]) + (_python(key[-1]),)
+            self.counts[key] = self.counts.get(key, 0) + int(count)
+
+        if 'scatter_columns' in self.config:
+            self._sample(df, self.rows)
+        self.rows += len(X)
+        self._index = None
+        return self
+
+    def _cell_key(self, values):
+        values = tuple(_python(v) for v in values)
+        return values if len(values) == 2 else values + (None,)
+
+    def _sample(self, df, first_row):
+        columns = list(dict.fromkeys(self.config['scatter_columns'] + self._key_columns()))
+        chunk = df[columns].reset_index(drop=True)
+        chunk['_row'] = np.arange(first_row, first_row + len(chunk))
+        chunk['_key'] = self.rng.random(len(chunk))
+        merged = chunk if self.sample is None else pd.concat([self.sample, chunk], ignore_index=True)
+        if len(merged) > self.sample_rows:
+            keep = np.argpartition(merged['_key'].to_numpy(), self.sample_rows)[:self.sample_rows]
+            merged = merged.iloc[keep].reset_index(drop=True)
+        self.sample = merged
+
+    # Cell and count keys with their ages and sexes as arrays, rebuilt after
+    # every update, for masking by cohort
+    def index(self):
+        if self._index is None:
+            cell_keys = list(self.cells)
+            count_keys = list(self.counts)
+            self._index = {
+                'cell_keys': cell_keys,
+                'cell_ages': np.array([key[0] for key in cell_keys], dtype=np.float64),
+                'cell_sexes': np.array([np.nan if key[1] is None else key[1] for key in cell_keys], dtype=np.float64),
+                'count_keys': count_keys,
+                'count_ages': np.array([key[0] for key in count_keys], dtype=np.float64),
+                'count_sexes': np.array([np.nan if key[1] is None else key[1] for key in count_keys], dtype=np.float64),
+            }
+        return self._index
+
+    def _totals(self, counts, index_name):
+        keys = sorted({key[0] for key in counts})
+        return pd.Series([sum(v for k, v in counts.items() if k[0] == key) for key in keys],
+                         index=pd.Index(keys, name=index_name), name='count')
+
+    def _crosstab(self, counts, index):
+        target = self.config['target']
+        outcomes = sorted({key[1] for key in counts})
+        table = pd.DataFrame([[counts.get((row, outcome), 0) for outcome in outcomes] for row in index],
+                             index=index, columns=pd.Index(outcomes, name=target))
+        return table[(table.sum(axis=1) > 0).to_numpy()]
+
+    @staticmethod
+    def _add(counts, key, value):
+        counts[key] = counts.get(key, 0) + value
+
+    def result(self, cohort=ALL_PATIENTS):
+        config = self.config
+        target = config['target']
+        cohort = normalize_cohort(self.name, cohort)
+        if self.rows == 0:
+            raise ValueError(f"No complete rows to aggregate for {self.name}")
+
+        index = self.index()
+        cells = [self.cells[key] for key in _select(index['cell_keys'], index['cell_ages'], index['cell_sexes'], cohort)]
+        if not cells:
+            raise ValueError(f"No {self.name} patients in the selected cohort")
+        rows, _, comoment = _merge_cells(cells)
+
+        # Counts by (age, outcome), (age group, outcome) and (sex, outcome)
+        age_counts, group_counts, sex_counts = {}, {}, {}
+        count_keys = _select(index['count_keys'], index['count_ages'], index['count_sexes'], cohort)
+        ages = sorted({key[0] for key in count_keys})
+        groups = dict(zip(ages, pd.cut(ages, bins=config['age_bins'], labels=config['age_labels'])))
+        for key in count_keys:
+            age, sex, outcome = key
+            value = self.counts[key]
+            self._add(age_counts, (age, outcome), value)
+            if not pd.isna(groups[age]):
+                self._add(group_counts, (groups[age], outcome), value)
+            if sex is not None:
+                self._add(sex_counts, (sex, outcome), value)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(np.diag(comoment))
+            corr = pd.DataFrame(comoment / np.outer(std, std), index=self.columns, columns=self.columns)
+        corr = corr.clip(-1.0, 1.0)
+        target_counts = self._totals({(k[1], k[0]): v for k, v in age_counts.items()}, target)
+        positive = int(target_counts.get(1, 0))
+
+        # Age histogram split by outcome, as (bin start, bin end, outcome, count) rows
+        edges = np.histogram_bin_edges(np.array(ages, dtype=np.float64), bins=AGE_HISTOGRAM_BINS)
+        histogram_rows = []
+        for outcome in target_counts.index:
+            values = [(a, c) for (a, o), c in age_counts.items() if o == outcome]
+            counts, _ = np.histogram([a for a, _ in values], bins=edges, weights=[c for _, c in values])
+            for start, end, count in zip(edges[:-1], edges[1:], counts):
+                histogram_rows.append((start, end, outcome, int(count)))
+        age_histogram = pd.DataFrame(histogram_rows, columns=['start', 'end', target, 'count'])
+
+        group_index = pd.CategoricalIndex(config['age_labels'], categories=config['age_labels'],
+                                          ordered=True, name=datasets.AGE_GROUP)
+        group_table = self._crosstab(group_counts, group_index)
+
+        all_ages = index['cell_ages']
+        aggregates = {
+            'name': self.name,
+            'cohort': cohort,
+            'rows': rows,
+            'skipped_rows': self.skipped_rows,
+            'age_range': (int(np.floor(all_ages.min())), int(np.ceil(all_ages.max()))),
+            'target_labels': config['target_labels'],
+            'target_counts': target_counts,
+            'positive': positive,
+            'risk_rate': positive / rows * 100,
+            'corr': corr,
+            # Top 5 features by absolute correlation with the outcome, excluding itself
+            'top_correlations': corr[target].abs().sort_values(ascending=False)[1:6],
+            'age_histogram': age_histogram,
+            'age_group_rates': group_table.div(group_table.sum(axis=1), axis=0) * 100,
+        }
+
+        if 'sex' in config:
+            sex_values = sorted({key[0] for key in sex_counts})
+            aggregates['sex_labels'] = config['sex_labels']
+            aggregates['sex_counts'] = self._totals(sex_counts, config['sex'])
+            aggregates['sex_target'] = self._crosstab(sex_counts, pd.Index(sex_values, name=config['sex']))
+
+        if 'scatter_columns' in config and self.sample is not None:
+            sample = self.sample
+            keep = _select(np.arange(len(sample)), sample[config['age']].to_numpy(dtype=np.float64),
+                           sample[config['sex']].to_numpy(dtype=np.float64) if 'sex' in config else None, cohort)
+            sample = sample.iloc[keep].sort_values('_row')
+            aggregates['scatter_sample'] = sample[config['scatter_columns']].reset_index(drop=True)
+
+        return aggregates
+
+    # Arrays and JSON-safe metadata that from_state() turns back into an
+    # equivalent accumulator, random generator position included
+    def state(self):
+        cell_keys = list(self.cells)
+        count_keys = list(self.counts)
+        arrays = {
+            'cell_ages': np.array([key[0] for key in cell_keys]),
+            'cell_rows': np.array([self.cells[key][0] for key in cell_keys], dtype=np.int64),
+            'cell_means': np.array([self.cells[key][1] for key in cell_keys]),
+            'cell_comoments': np.array([self.cells[key][2] for key in cell_keys]),
+            'count_ages': np.array([key[0] for key in count_keys]),
+            'count_outcomes': np.array([key[2] for key in count_keys]),
+            'count_values': np.array([self.counts[key] for key in count_keys], dtype=np.int64),
+        }
+        if 'sex' in self.config:
+            arrays['cell_sexes'] = np.array([key[1] for key in cell_keys])
+            arrays['count_sexes'] = np.array([key[1] for key in count_keys])
+        if self.sample is not None:
+            for i, column in enumerate(self.sample.columns):
+                arrays[f'sample_{i}'] = self.sample[column].to_numpy()
+        meta = {
+            'name': self.name,
+            'sample_rows': self.sample_rows,
+            'rng': self.rng.bit_generator.state,
+            'columns': self.columns,
+            'rows': self.rows,
+            'skipped_rows': self.skipped_rows,
+            'sample_columns': None if self.sample is None else list(self.sample.columns),
+        }
+        return meta, arrays
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        accumulator = cls(meta['name'], meta['sample_rows'])
+        accumulator.rng.bit_generator.state = meta['rng']
+        accumulator.columns = meta['columns']
+        accumulator.rows = meta['rows']
+        accumulator.skipped_rows = meta['skipped_rows']
+
+        def sexes(field, length):
+            return arrays[field].tolist() if field in arrays else [None] * length
+
+        cell_ages = arrays['cell_ages'].tolist()
+        for key, rows, mean, comoment in zip(zip(cell_ages, sexes('cell_sexes', len(cell_ages))),
+                                             arrays['cell_rows'].tolist(), arrays['cell_means'],
+                                             arrays['cell_comoments']):
+            accumulator.cells[key] = (rows, mean, comoment)
+        count_ages = arrays['count_ages'].tolist()
+        keys = zip(count_ages, sexes('count_sexes', len(count_ages)), arrays['count_outcomes'].tolist())
+        accumulator.counts = dict(zip(keys, arrays['count_values'].tolist()))
+        if meta['sample_columns'] is not None:
+            accumulator.sample = pd.DataFrame({column: arrays[f'sample_{i}']
+                                               for i, column in enumerate(meta['sample_columns'])})
+        return accumulator
+
+
+def _python(value):
+    return value.item() if hasattr(value, 'item') else value
+
+
+# Chan et al.'s merge of two (rows, mean, comoment) summaries
+def _merge_moments(a, b):
+    if a is None:
+        return b
+    rows = a[0] + b[0]
+    delta = b[1] - a[1]
+    return rows, a[1] + delta * (b[0] / rows), a[2] + b[2] + np.outer(delta, delta) * (a[0] * b[0] / rows)
+
+
+# The same merge over many cells at once
+def _merge_cells(cells):
+    rows = np.array([cell[0] for cell in cells], dtype=np.float64)
+    means = np.stack([cell[1] for cell in cells])
+    total = rows.sum()
+    mean = rows @ means / total
+    deviations = means - mean
+    comoment = np.sum([cell[2] for cell in cells], axis=0) + (deviations * rows[:, None]).T @ deviations
+    return int(total), mean, comoment
+
+
+# Items whose ages (and sexes, when given) fall in the cohort
+def _select(items, ages, sexes, cohort):
+    mask = np.ones(len(ages), dtype=bool)
+    if cohort.age_min is not None:
+        mask &= ages >= cohort.age_min
+    if cohort.age_max is not None:
+        mask &= ages <= cohort.age_max
+    if cohort.sex is not None and sexes is not None:
+        mask &= sexes == cohort.sex
+    if isinstance(items, np.ndarray):
+        return items[mask]
+    return [item for item, keep in zip(items, mask) if keep]
+
+
+def compute_aggregates(name, df, cohort=ALL_PATIENTS):
+    return AggregateAccumulator(name).update(df).result(cohort)
+
+
+# Aggregates of a ';'-separated file read in chunks of 'chunksize' rows;
+# memory use depends on the chunk size, not the file size. on_chunk(chunk)
+# is called with every raw chunk, e.g. to score it.
+def stream_aggregates(name, source=None, chunksize=STREAM_CHUNK_ROWS, on_chunk=None):
+    accumulator = AggregateAccumulator(name)
+    for chunk in pd.read_csv(source or datasets.dataset_path(name), sep=';', chunksize=chunksize):
+        accumulator.update(chunk)
+        if on_chunk is not None:
+            on_chunk(chunk)
+    return accumulator.result()
+
+
+def store_path(name):
+    return os.path.join(datasets.cache_dir, f'{name}.aggregates.npz')
+
+
+# Hash of the first 'offset' bytes of the file, sampled: the first and last
+# blocks (the header included) and FINGERPRINT_BLOCKS blocks spread between
+# them. An append leaves it unchanged; a rewrite almost always changes it.
+def fingerprint(path, offset):
+    digest = hashlib.sha256(str(offset).encode())
+    positions = {0, max(0, offset - FINGERPRINT_BLOCK)}
+    positions.update(offset * i // (FINGERPRINT_BLOCKS + 1) for i in range(1, FINGERPRINT_BLOCKS + 1))
+    with open(path, 'rb') as f:
+        for position in sorted(positions):
+            f.seek(position)
+            digest.update(f.read(min(FINGERPRINT_BLOCK, offset - position)))
+    return digest.hexdigest()
+
+
+# (accumulator, offset, fingerprint) from the store, or None when there is
+# no usable store
+def load_store(name):
+    try:
+        with np.load(store_path(name), allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            arrays = {key: data[key] for key in data.files if key != 'meta'}
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+        logger.warning('Ignoring unreadable aggregate store for %s: %s', name, e)
+        return None
+    if meta.get('format') != STORE_FORMAT or meta.get('name') != name:
+        return None
+    return AggregateAccumulator.from_state(meta, arrays), meta['offset'], meta['fingerprint']
+
+
+def save_store(name, accumulator, offset, digest):
+    meta, arrays = accumulator.state()
+    meta.update(format=STORE_FORMAT, offset=offset, fingerprint=digest)
+    path = store_path(name)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        os.makedirs(datasets.cache_dir, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning('Could not save the aggregate store for %s: %s', name, e)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Read-only window [start, end) of an open binary file, for read_csv
+class _ByteRange(io.RawIOBase):
+
+    def __init__(self, f, start, end):
+        f.seek(start)
+        self._f = f
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._remaining)
+        data = self._f.read(size)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+def _read_rows(f, start, end, names, chunksize):
+    if end <= start:
+        return []
+    return pd.read_csv(io.BufferedReader(_ByteRange(f, start, end)), sep=';', header=None, names=names,
+                       chunksize=chunksize)
+
+
+# Position just after the last line break, or 0 if there is none
+def _last_line_end(f, size):
+    position = size
+    while position > 0:
+        step = min(FINGERPRINT_BLOCK, position)
+        f.seek(position - step)
+        index = f.read(step).rfind(b'\n')
+        if index >= 0:
+            return position - step + index + 1
+        position -= step
+    return 0
+
+
+# Full rebuild of a file that ends with a line break from the compact view
+# of datasets.py, in slices of 'chunksize' rows so the float64 copies stay
+# bounded. Returns False, having absorbed nothing, when the file is not
+# 'size' bytes long or changed while it was read.
+def _absorb_view(name, accumulator, size, chunksize):
+    version = datasets.dataset_version(name)
+    if version[1] != size:
+        return False
+    df = datasets.load_dataset(name, list(datasets.DATASETS[name]['dtypes']))
+    if datasets.dataset_version(name) != version:
+        return False
+    for start in range(0, len(df), chunksize):
+        accumulator.update(df.iloc[start:start + chunksize])
+    return True
+
+
+# Absorb the rows of the file after 'offset' into accumulator. Returns the
+# accumulator over the complete lines, the new offset, and the accumulator
+# including a last line without a line break (it may still be being
+# written, so it is not stored and is read again next time).
+def _absorb(name, accumulator, offset, chunksize=STREAM_CHUNK_ROWS):
+    with open(datasets.dataset_path(name), 'rb') as f:
+        header = f.readline()
+        names = list(pd.read_csv(io.BytesIO(header), sep=';', nrows=0).columns)
+        size = os.fstat(f.fileno()).st_size
+        start = max(offset, len(header))
+        end = max(_last_line_end(f, size), start)
+        rows = accumulator.rows + accumulator.skipped_rows
+        if offset or end != size or not _absorb_view(name, accumulator, size, chunksize):
+            for chunk in _read_rows(f, start, end, names, chunksize):
+                accumulator.update(chunk)
+        ABSORBED_ROWS.inc(name, 'append' if offset else 'full',
+                          amount=accumulator.rows + accumulator.skipped_rows - rows)
+
+        current = accumulator
+        if end < size:
+            current = copy.deepcopy(accumulator)
+            for chunk in _read_rows(f, end, size, names, chunksize):
+                current.update(chunk)
+    return accumulator, end, current
+
+
+# Bring the stored aggregates of a dataset up to date with the file and
+# return (store entry, accumulator over the whole file). 'entry' is a
+# previously returned (accumulator, offset, fingerprint), read from the store
+# when omitted; it is updated in place and must not be reused if this raises.
+def update_store(name, entry=None):
+    path = datasets.dataset_path(name)
+    if entry is None:
+        entry = load_store(name)
+    if entry is not None:
+        offset, digest = entry[1], entry[2]
+        if os.path.getsize(path) < offset or fingerprint(path, offset) != digest:
+            logger.info('%s was rewritten, aggregating it again', name)
+            entry = None
+
+    if entry is None:
+        accumulator, offset, digest = AggregateAccumulator(name), 0, None
+    else:
+        accumulator = entry[0]
+    accumulator, end, current = _absorb(name, accumulator, offset)
+    if end != offset or digest is None:
+        digest = fingerprint(path, end)
+        save_store(name, accumulator, end, digest)
+    return (accumulator, end, digest), current
+
+
+# Aggregates for one dataset, brought up to date whenever the file on disk
+# changes. A cohort (see Cohort) restricts them to part of the patients;
+# filtered results are cached per dataset version.
+def get_aggregates(name, cohort=None):
+    cohort = normalize_cohort(name, cohort)
+    version = datasets.dataset_version(name)
+    cached = _cache.get(name)
+    if cached is None or cached[0] != version:
+        with _lock:
+            cached = _cache.pop(name, None)
+            if cached is None or cached[0] != version:
+                with COMPUTE_SECONDS.time(name):
+                    entry, current = update_store(name, cached[2] if cached is not None else None)
+                    aggregates = current.result()
+                aggregates['version'] = version
+                cached = (version, aggregates, entry, current)
+            _cache[name] = cached
+    if cohort == ALL_PATIENTS:
+        return cached[1]
+
+    key = (name, cached[0], cohort)
+    with _lock:
+        aggregates = _cohort_cache.get(key)
+        if aggregates is None:
+            aggregates = cached[3].result(cohort)
+            aggregates['version'] = cached[0]
+            _cohort_cache[key] = aggregates
+            if len(_cohort_cache) > COHORT_CACHE_SIZE:
+                _cohort_cache.popitem(last=False)
+        else:
+            _cohort_cache.move_to_end(key)
+    return aggregates
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Update the stored Data Analytics aggregates.')
+    parser.add_argument('datasets', nargs='*', help=f"any of {', '.join(datasets.DATASETS)} (default: all)")
+    parser.add_argument('--rebuild', action='store_true', help='discard the stored state and aggregate from scratch')
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.datasets) - set(datasets.DATASETS))
+    if unknown:
+        parser.error(f"unknown dataset: {', '.join(unknown)}")
+
+    for name in args.datasets or datasets.DATASETS:
+        if args.rebuild and os.path.exists(store_path(name)):
+            os.remove(store_path(name))
+        (_, offset, _), current = update_store(name)
+        aggregates = current.result()
+        absorbed = ABSORBED_ROWS.value(name, 'append') + ABSORBED_ROWS.value(name, 'full')
+        print(f"{name}: {aggregates['rows']:,} rows ({aggregates['skipped_rows']:,} skipped), "
+              f"{absorbed:,} absorbed, {offset:,} bytes consumed")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
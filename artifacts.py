@@ -0,0 +1,155 @@
+# Compact model artifacts: the fitted arrays of each saved model stored as
+# plain .npy files next to a small manifest.json. Loading is one np.load per
+# array with mmap_mode='r' and allow_pickle=False, so no pickled code runs at
+# startup and worker processes share the pages through the OS file cache.
+#
+#   python artifacts.py export      # saved_models/*.pkl -> saved_models/compact/<name>/
+#
+# Exporting needs scikit-learn; loading and predicting only need numpy. The
+# arrays are laid out for the kernels in kernels.py, including the tables
+# derived from them that the forest lookup needs. The manifest also keeps
+# what is fitted on the bundled dataset at export: the SVMs' probability
+# calibration, on 5-fold cross-validated decision values, and for linear
+# models the feature means that feature contributions are measured from.
+
+import json
+import os
+import sys
+
+import numpy as np
+
+import kernels
+
+working_dir = os.path.dirname(os.path.abspath(__file__))
+models_dir = os.path.join(working_dir, 'saved_models')
+compact_dir = os.path.join(models_dir, 'compact')
+
+# 3: 'calibration' (SVMs) and 'baseline' (models with coefficients) are required
+# 4: forests carry their exit-leaf lookup tables (kernels.forest_lookup)
+FORMAT_VERSION = 4
+# Folds for the out-of-fold decision values the SVM calibration is fitted on
+CALIBRATION_FOLDS = 5
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def artifact_path(model_file):
+    return os.path.join(compact_dir, os.path.splitext(model_file)[0])
+
+
+# reference_data: (X, y) of the training data, see reference_fields
+def export_model(estimator, directory, source=None, reference_data=None):
+    import sklearn
+
+    fields, arrays = kernels.extract(estimator)
+    if reference_data is not None:
+        fields.update(reference_fields(kernels.build(arrays, fields), estimator, *reference_data))
+    missing = missing_fields(fields, arrays)
+    if missing:
+        raise ArtifactError(f"Exporting {fields['estimator']} needs reference_data to fit {', '.join(missing)}")
+    os.makedirs(directory, exist_ok=True)
+    for key, value in arrays.items():
+        np.save(os.path.join(directory, f'{key}.npy'), value, allow_pickle=False)
+
+    manifest = {
+        'format': FORMAT_VERSION,
+        'source': source,
+        'sklearn_version': sklearn.__version__,
+        **fields,
+        'arrays': {key: {'dtype': str(value.dtype), 'shape': list(value.shape)} for key, value in arrays.items()},
+    }
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_artifact(directory, mmap=True):
+    manifest_path = os.path.join(directory, 'manifest.json')
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"Could not read {manifest_path}: {e}") from e
+
+    if manifest.get('format') != FORMAT_VERSION:
+        raise ArtifactError(f"{directory} has artifact format {manifest.get('format')}, expected {FORMAT_VERSION}; "
+                            f"re-run python artifacts.py export")
+    if manifest.get('kind') not in kernels.KERNEL_TYPES:
+        raise ArtifactError(f"Unsupported artifact in {directory}")
+    missing = missing_fields(manifest, manifest['arrays'])
+    if missing:
+        raise ArtifactError(f"{directory} is missing {', '.join(missing)}; re-run python artifacts.py export")
+
+    arrays = {}
+    for key, spec in manifest['arrays'].items():
+        value = np.load(os.path.join(directory, f'{key}.npy'),
+                        mmap_mode='r' if mmap else None, allow_pickle=False)
+        if str(value.dtype) != spec['dtype'] or list(value.shape) != spec['shape']:
+            raise ArtifactError(f"{key}.npy in {directory} does not match its manifest")
+        # Plain ndarray view on the same mapping; skips np.memmap's per-operation overhead
+        arrays[key] = np.asarray(value)
+    return kernels.build(arrays, manifest)
+
+
+# Manifest fields fitted at export that the kernel needs but 'fields' lacks;
+# 'arrays' are the kernel's arrays or their manifest entries
+def missing_fields(fields, arrays):
+    required = []
+    if fields['kind'] == 'svc':
+        required.append('calibration')
+    if 'coef' in arrays:
+        required.append('baseline')
+    return [field for field in required if field not in fields]
+
+
+# Out-of-fold decision values on (X, y): each fold is scored by a copy of the
+# estimator, with the same hyperparameters, refitted on the other folds, as
+# libsvm does for probability=True. The model's decision values on its own
+# training rows are more confident than on new patients, so a sigmoid fitted
+# on those would overstate the probabilities.
+def cross_val_decisions(estimator, X, y, folds=CALIBRATION_FOLDS):
+    from sklearn.base import clone
+    from sklearn.model_selection import StratifiedKFold, cross_val_predict
+
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=0)
+    return cross_val_predict(clone(estimator), X, y, cv=cv, method='decision_function')
+
+
+# Manifest fields fitted on the training data (X, y) of the sklearn
+# 'estimator' that 'kernel' was compiled from: the probability calibration
+# of SVMs and the contribution baseline of linear models. Also sets them on
+# 'kernel'.
+def reference_fields(kernel, estimator, X, y):
+    fields = {}
+    if kernel.kind == 'svc':
+        scores = cross_val_decisions(estimator, X, y)
+        fields['calibration'] = kernel.calibrate(scores, y, CALIBRATION_FOLDS)
+    if kernel.kind in ('linear', 'svc') and hasattr(kernel, 'coef'):
+        fields['baseline'] = kernel.set_baseline(X)
+    return fields
+
+
+# Export every pickled model listed in engine.MODEL_FILES
+def export_all():
+    import pickle
+    from engine import MODEL_FILES, reference_data
+
+    for disease, files in MODEL_FILES.items():
+        for model_file in files.values():
+            with open(os.path.join(models_dir, model_file), 'rb') as f:
+                estimator = pickle.load(f)
+            directory = artifact_path(model_file)
+            manifest = export_model(estimator, directory, source=model_file,
+                                    reference_data=reference_data(disease))
+            size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+            print(f"{model_file} -> {os.path.relpath(directory, working_dir)} "
+                  f"({manifest['estimator']}, {size / 1024:.0f} KB)")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['export']:
+        print('usage: python artifacts.py export')
+        sys.exit(1)
+    export_all()
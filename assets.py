@@ -0,0 +1,95 @@
+# Static assets for app3.py: the stylesheet.
+#
+# static/app.css is minified and content-hashed once per process. By default
+# the app inlines it in a <style> tag on every rerun. When ASSET_BASE_URL is
+# set, the app links to the hashed file instead, so browsers download it once
+# and cache it. Streamlit's own static serving sends .css as text/plain,
+# which browsers refuse as a stylesheet, so the file has to be served
+# elsewhere: by the JSON server's /static/ route (see server.py) or by any web
+# server or CDN the build directory is copied to.
+#
+#   python assets.py build     # write static/build/app.<hash>.css
+#   ASSET_BASE_URL=http://localhost:8000/static streamlit run app3.py
+
+import functools
+import hashlib
+import html
+import os
+import re
+import sys
+
+working_dir = os.path.dirname(os.path.abspath(__file__))
+static_dir = os.path.join(working_dir, 'static')
+build_dir = os.path.join(static_dir, 'build')
+
+ASSET_BASE_URL = os.environ.get('ASSET_BASE_URL', '').rstrip('/')
+
+# Quoted strings are copied as they are; comments and whitespace between
+# tokens are dropped
+_CSS_TOKENS = re.compile(r'''("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|(/\*.*?\*/)|(\s+)|([^"'/\s]+|/)''', re.S)
+_CSS_PUNCTUATION = set('{};,>:')
+
+
+def minify_css(text):
+    out = []
+    pending_space = False
+    for string, comment, space, token in _CSS_TOKENS.findall(text):
+        if comment:
+            continue
+        if space:
+            pending_space = True
+            continue
+        token = string or token.replace(';}', '}')
+        # Keep a space only between two tokens that both need it, e.g.
+        # descendant selectors and multi-value properties
+        if pending_space and out and out[-1][-1] not in _CSS_PUNCTUATION and token[0] not in _CSS_PUNCTUATION - {':'}:
+            out.append(' ')
+        if token.startswith('}') and out and out[-1].endswith(';'):
+            out[-1] = out[-1][:-1]
+        out.append(token)
+        pending_space = False
+    return ''.join(out)
+
+
+# (hashed file name, minified text) of static/app.css
+@functools.lru_cache(maxsize=None)
+def stylesheet():
+    with open(os.path.join(static_dir, 'app.css'), encoding='utf-8') as f:
+        css = minify_css(f.read())
+    digest = hashlib.sha256(css.encode('utf-8')).hexdigest()[:12]
+    return f'app.{digest}.css', css
+
+
+# What the app puts in the page to load the stylesheet
+@functools.lru_cache(maxsize=None)
+def style_tag():
+    name, css = stylesheet()
+    if ASSET_BASE_URL:
+        return f'<link rel="stylesheet" href="{html.escape(ASSET_BASE_URL)}/{name}">'
+    return f'<style>{css}</style>'
+
+
+# Write the hashed stylesheet to 'directory' and return its path
+def build(directory=build_dir):
+    name, css = stylesheet()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(css)
+        os.replace(tmp_path, path)
+    return path
+
+
+def main(argv):
+    if argv != ['build']:
+        print('usage: python assets.py build', file=sys.stderr)
+        return 2
+    path = build()
+    print(f'{os.path.relpath(path, working_dir)} ({os.path.getsize(path):,} bytes)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,97 @@
+# Batch scoring for diabetes and heart disease rosters
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from engine import FEATURE_COLUMNS, MODEL_NAMES, RISK_LEVELS, check_key, risk_levels
+from engine import score_batch as score_rows
+
+DEFAULT_CHUNKSIZE = 10000
+
+
+# Check the header and coerce one chunk to the model's feature order.
+# Blank cells become 0.0 like the single prediction form; anything else that
+# is not a finite number (including inf) is rejected with the offending row
+# numbers.
+def validate_chunk(chunk, disease, first_row=0):
+    check_key(disease)
+    columns = FEATURE_COLUMNS[disease]
+    missing = [c for c in columns if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing columns for {disease} scoring: {', '.join(missing)}")
+
+    features = chunk[columns].apply(pd.to_numeric, errors='coerce')
+    bad = (features.isna() | np.isinf(features)) & chunk[columns].notna()
+    if bad.any().any():
+        rows = (bad.any(axis=1).to_numpy().nonzero()[0] + first_row + 2)[:10]
+        raise ValueError(f"Non-numeric or infinite values in rows: {', '.join(str(r) for r in rows)}")
+
+    return features.fillna(0.0).astype(float)
+
+
+# Read a ';'-separated file in chunks, yielding (raw chunk, validated features)
+def read_batch(source, disease, chunksize=DEFAULT_CHUNKSIZE):
+    first_row = 0
+    for chunk in pd.read_csv(source, sep=';', chunksize=chunksize, skipinitialspace=True):
+        chunk.columns = [c.strip() for c in chunk.columns]
+        yield chunk, validate_chunk(chunk, disease, first_row)
+        first_row += len(chunk)
+
+
+# Append the label, the calibrated probability of disease and its triage
+# level, all from one vectorized model pass over the chunk
+def add_scores(chunk, features, disease, model_choice, cutoffs=None):
+    labels, probabilities = score_rows(disease, model_choice, features.to_numpy())
+    return chunk.assign(Prediction=labels, Probability=probabilities.round(4),
+                        RiskLevel=risk_levels(probabilities, cutoffs))
+
+
+# Score every chunk with one vectorized call per chunk; the input columns are
+# kept as they were and Prediction, Probability and RiskLevel are appended
+def score_batch(source, disease, model_choice, chunksize=DEFAULT_CHUNKSIZE, cutoffs=None):
+    check_key(disease, model_choice)
+    for chunk, features in read_batch(source, disease, chunksize):
+        yield add_scores(chunk, features, disease, model_choice, cutoffs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a diabetes or heart disease CSV file in batch.')
+    parser.add_argument('disease', choices=sorted(FEATURE_COLUMNS))
+    parser.add_argument('input', help="';'-separated file shaped like dataset/diabetes.csv or dataset/heart.csv")
+    parser.add_argument('output', help='where to write the scored file')
+    parser.add_argument('--model', default='Random Forest', choices=MODEL_NAMES)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    rows = 0
+    positives = 0
+    levels = dict.fromkeys(RISK_LEVELS, 0)
+    # Written next to the output and renamed over it once every chunk has
+    # been scored, so a failed run leaves no partial file behind
+    tmp_path = f'{args.output}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'w', newline='') as out:
+            header = True
+            for scored in score_batch(args.input, args.disease, args.model, args.chunksize):
+                scored.to_csv(out, sep=';', index=False, header=header)
+                header = False
+                rows += len(scored)
+                positives += int(scored['Prediction'].sum())
+                for level, count in scored['RiskLevel'].value_counts().items():
+                    levels[level] += int(count)
+        os.replace(tmp_path, args.output)
+    except ValueError as e:
+        parser.exit(1, f"Invalid input file: {e}\n")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    print(f"Scored {rows} rows with {args.model}: {positives} high risk, written to {args.output}")
+    print('Risk levels: ' + ', '.join(f'{level} {count}' for level, count in levels.items()))
+
+
+if __name__ == '__main__':
+    main()
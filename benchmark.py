@@ -0,0 +1,313 @@
+# Reproducible benchmarks for the hot paths: loading the saved models,
+# single-row and batched prediction for all six models, the Data Analytics
+# aggregates on the bundled datasets and on up-scaled copies, and chart
+# construction. Every case reports p50/p99/mean timings and the peak memory
+# it allocates (tracemalloc, measured in a separate untimed run). Results are
+# written to benchmark_results/<commit>.json so runs can be compared.
+#
+#   python benchmark.py                          # everything, 1M-row analytics
+#   python benchmark.py --rows 1000000 10000000  # also 10M rows (slow, ~GBs of RAM)
+#   python benchmark.py --only predict --quick
+#   python benchmark.py --compare benchmark_results/abc1234.json
+
+import argparse
+import gc
+import json
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import analytics
+import artifacts
+import charts
+import datasets
+import engine
+import generate_data
+
+working_dir = os.path.dirname(os.path.abspath(__file__))
+results_dir = os.path.join(working_dir, 'benchmark_results')
+
+GROUPS = ['load', 'predict', 'analytics', 'figures']
+DEFAULT_ROWS = [1_000_000]
+BATCH_ROWS = 10_000
+
+
+def commit_id():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=working_dir,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+# Timings of repeat calls after one warm-up call, in milliseconds
+def measure(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    timings = np.array(timings)
+    return {
+        'runs': repeat,
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p99_ms': float(np.percentile(timings, 99)),
+        'mean_ms': float(timings.mean()),
+        'min_ms': float(timings.min()),
+    }
+
+
+# Peak bytes allocated by one call, traced separately so tracing does not
+# slow down the timed runs
+def peak_memory(fn):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def max_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+# Directory holding synthetic copies of both dataset files with 'rows' rows
+# each (see generate_data.py), written on first use
+def scaled_directory(tmp_dir, rows):
+    directory = os.path.join(tmp_dir, f'{rows}_rows')
+    for name, config in datasets.DATASETS.items():
+        path = os.path.join(directory, config['file'])
+        if not os.path.exists(path):
+            generate_data.write_csv(name, rows, path)
+    return directory
+
+
+# fn, run with the dataset layer (files, Arrow cache and aggregate stores)
+# pointed at 'directory' instead of dataset/
+def in_directory(directory, fn):
+    def run():
+        saved = datasets.dataset_dir, datasets.cache_dir
+        datasets.dataset_dir, datasets.cache_dir = directory, os.path.join(directory, '.cache')
+        try:
+            return fn()
+        finally:
+            datasets.dataset_dir, datasets.cache_dir = saved
+    return run
+
+
+# Aggregate the dataset from scratch, as after a rewrite of the file
+def rebuild_store(name):
+    if os.path.exists(analytics.store_path(name)):
+        os.remove(analytics.store_path(name))
+    return analytics.update_store(name)
+
+
+# Append 'rows' synthetic rows to the dataset file and absorb them into the
+# stored aggregates, like a file that is being written to
+def append_rows(name, rows, seed=1):
+    block = pd.concat(generate_data.generate(name, rows, seed), ignore_index=True).to_csv(
+        sep=';', index=False, header=False).encode()
+    entry = None
+
+    def append():
+        nonlocal entry
+        with open(datasets.dataset_path(name), 'ab') as f:
+            f.write(block)
+        entry, current = analytics.update_store(name, entry)
+        return current
+    return append
+
+
+# Cases for the aggregates of the dataset files in 'directory' (None for the
+# bundled ones)
+def store_cases(label, directory, repeat):
+    def wrap(fn):
+        return fn if directory is None else in_directory(directory, fn)
+
+    cases = []
+    for name in datasets.DATASETS:
+        cases.append((f'{label} {name} load_dataset', wrap(lambda name=name: datasets.load_dataset(name)), repeat))
+        cases.append((f'{label} {name} full rebuild', wrap(lambda name=name: rebuild_store(name)), repeat))
+        cases.append((f'{label} {name} update_store (unchanged)',
+                      wrap(lambda name=name: analytics.update_store(name)), repeat))
+        _, current = wrap(lambda name=name: analytics.update_store(name))()
+        cases.append((f'{label} {name} cohort aggregates (age 40-60)',
+                      lambda current=current: current.result(analytics.Cohort(40, 60)), repeat))
+    return cases
+
+
+def load_cases(repeat):
+    cases = []
+    for disease, files in engine.MODEL_FILES.items():
+        for model_choice, model_file in files.items():
+            path = os.path.join(engine.models_dir, model_file)
+
+            def unpickle(path=path):
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    with open(path, 'rb') as f:
+                        return pickle.load(f)
+
+            cases.append((f'unpickle {model_file}', unpickle, repeat))
+
+            directory = artifacts.artifact_path(model_file)
+            if os.path.isdir(directory):
+                cases.append((f'load artifact {os.path.basename(directory)}',
+                              lambda directory=directory: artifacts.load_artifact(directory), repeat))
+    return cases
+
+
+def predict_cases(repeat):
+    cases = []
+    rng = np.random.default_rng(0)
+    for disease in engine.DISEASES:
+        df = datasets.get_dataset(disease, engine.FEATURE_COLUMNS[disease])
+        X = df[engine.FEATURE_COLUMNS[disease]].to_numpy(dtype=float)
+        batch = X[rng.integers(0, len(X), BATCH_ROWS)]
+        row = X[0].tolist()
+        for model_choice in engine.MODEL_NAMES:
+            model = engine.get_model(disease, model_choice)
+            cases.append((f'{disease} {model_choice} row',
+                          lambda model=model, row=row: model.predict_row(row), repeat * 20))
+            cases.append((f'{disease} {model_choice} predict() {BATCH_ROWS} rows',
+                          lambda model=model, batch=batch: model.predict(batch), max(3, repeat // 2)))
+            cases.append((f'{disease} {model_choice} score() {BATCH_ROWS} rows',
+                          lambda model=model, batch=batch: model.score(batch), max(3, repeat // 2)))
+            cases.append((f'{disease} {model_choice} contributions() {BATCH_ROWS} rows',
+                          lambda model=model, batch=batch: model.contributions(batch), max(3, repeat // 2)))
+    return cases
+
+
+def analytics_cases(repeat, scaled_rows, tmp_dir):
+    cases = []
+    for name in datasets.DATASETS:
+        path = datasets.dataset_path(name)
+        cases.append((f'bundled {name} read_csv', lambda path=path: pd.read_csv(path, sep=';'), repeat))
+    cases += store_cases('bundled', None, repeat)
+
+    for rows in scaled_rows:
+        directory = scaled_directory(tmp_dir, rows)
+        scaled_repeat = max(3, repeat // 10)
+        cases += store_cases(f'{rows:,} rows', directory, scaled_repeat)
+        for name in datasets.DATASETS:
+            cases.append((f'{rows:,} rows {name} append 10,000 rows',
+                          in_directory(directory, append_rows(name, 10_000)), scaled_repeat))
+    return cases
+
+
+def figure_cases(repeat, scaled_rows, tmp_dir):
+    cases = []
+    sizes = [('bundled', None)] + [(f'{rows:,} rows', rows) for rows in scaled_rows]
+    for label, rows in sizes:
+        if rows is None:
+            stats = {name: analytics.get_aggregates(name) for name in datasets.DATASETS}
+        else:
+            stats = in_directory(scaled_directory(tmp_dir, rows), lambda: {
+                name: analytics.update_store(name)[1].result() for name in datasets.DATASETS})()
+        for tab, build in charts.TAB_BUILDERS.items():
+            cases.append((f'{label} {tab}', lambda build=build, stats=stats: build(stats['diabetes'], stats['heart']),
+                          repeat))
+    return cases
+
+
+def run(groups, repeat, scaled_rows, log=print):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for group in groups:
+            if group == 'load':
+                cases = load_cases(repeat)
+            elif group == 'predict':
+                cases = predict_cases(repeat)
+            elif group == 'analytics':
+                cases = analytics_cases(repeat, scaled_rows, tmp_dir)
+            else:
+                cases = figure_cases(repeat, scaled_rows, tmp_dir)
+
+            for name, fn, case_repeat in cases:
+                result = {'group': group, 'name': name, **measure(fn, case_repeat), 'peak_kb': peak_memory(fn) // 1024}
+                results.append(result)
+                log(f"{group:<10} {name:<52} p50 {result['p50_ms']:>10.3f} ms  p99 {result['p99_ms']:>10.3f} ms  "
+                    f"peak {result['peak_kb']:>9,} KB")
+    return results
+
+
+def compare(results, baseline, log=print):
+    previous = {(r['group'], r['name']): r for r in baseline['results']}
+    log(f"\nCompared with {baseline['commit']} (ratio of p50, < 1 is faster):")
+    for result in results:
+        old = previous.get((result['group'], result['name']))
+        if old is None or not old['p50_ms']:
+            continue
+        ratio = result['p50_ms'] / old['p50_ms']
+        flag = '  <-- slower' if ratio > 1.2 else ''
+        log(f"{result['group']:<10} {result['name']:<52} {old['p50_ms']:>10.3f} -> {result['p50_ms']:>10.3f} ms  "
+            f"x{ratio:.2f}{flag}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmark model loading, prediction, analytics and charts.')
+    parser.add_argument('--only', nargs='+', choices=GROUPS, default=GROUPS)
+    parser.add_argument('--rows', nargs='*', type=int, default=DEFAULT_ROWS,
+                        help='sizes of the up-scaled datasets for analytics and figures (none to skip)')
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--quick', action='store_true', help='5 repeats and no up-scaled datasets')
+    parser.add_argument('--output', help='results file (default benchmark_results/<commit>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args(argv)
+
+    if args.quick:
+        args.repeat, args.rows = 5, []
+
+    commit = commit_id()
+    results = run(args.only, args.repeat, args.rows)
+    report = {
+        'commit': commit,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': f'{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs',
+        'max_rss_kb': max_rss_kb(),
+        'settings': {'groups': args.only, 'repeat': args.repeat, 'rows': args.rows},
+        'results': results,
+    }
+
+    output = args.output or os.path.join(results_dir, f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nmax RSS {report['max_rss_kb'] or 0:,} KB, results written to {os.path.relpath(output)}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
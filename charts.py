@@ -0,0 +1,312 @@
+# Plotly figures for the 'Data Analytics' page. Figures are built from the
+# analytics aggregates once per dataset version, cohort and tab, then reused
+# by every rerun and session; st.plotly_chart only has to serialize them.
+# Every label, count and total shown comes from the aggregates.
+
+import collections
+import threading
+
+import plotly.express as px
+
+TABS = ["🥧 Disease Distribution", "📊 Risk Factors", "🔥 Correlations", "👥 Demographics"]
+
+# All charts are static (no toolbar, no hover or zoom)
+CHART_CONFIG = {'displayModeBar': False, 'staticPlot': True}
+
+# Tabs' figures kept per process, oldest first
+FIGURE_CACHE_SIZE = 32
+
+_cache = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+def _label(labels, value):
+    return labels.get(value, str(value))
+
+
+# 'No Diabetes (500)'-style names for the slices of a count series
+def _count_names(counts, labels):
+    return [f'{_label(labels, value)} ({count:,})' for value, count in counts.items()]
+
+
+# Copy of a table with outcome values replaced by their labels, in the
+# column 'column' or in the column index
+def _outcome_labels(df, stats, column=None):
+    labels = stats['target_labels']
+    if column is not None:
+        return df.assign(**{column: df[column].map(lambda value: _label(labels, value))})
+    return df.rename(columns=lambda value: _label(labels, value))
+
+
+# Age axis spanning the whole dataset, so filtered cohorts keep their scale
+def _age_axis(stats):
+    low, high = stats['age_range']
+    return dict(range=[low - 5, high + 5])
+
+
+def distribution_figures(diabetes_stats, heart_stats):
+    # Diabetes Distribution Pie Chart
+    diabetes_counts = diabetes_stats['target_counts']
+    fig1 = px.pie(
+        values=diabetes_counts.values,
+        names=_count_names(diabetes_counts, diabetes_stats['target_labels']),
+        title=f"<b>Diabetes Dataset Distribution</b><br><sub>Total: {diabetes_stats['rows']:,} patients</sub>",
+        color_discrete_sequence=['#16a34a', '#dc2626'],
+        hole=0.4
+    )
+    fig1.update_traces(textposition='inside', textinfo='percent+label', textfont_size=12)
+    fig1.update_layout(
+        font=dict(family="Poppins, sans-serif", size=14),
+        title_x=0.5,
+        showlegend=True,
+        height=400,
+        margin=dict(t=80, b=20, l=20, r=20)
+    )
+
+    # Heart Disease Distribution Pie Chart
+    heart_counts = heart_stats['target_counts']
+    fig2 = px.pie(
+        values=heart_counts.values,
+        names=_count_names(heart_counts, heart_stats['target_labels']),
+        title=f"<b>Heart Disease Dataset Distribution</b><br><sub>Total: {heart_stats['rows']:,} patients</sub>",
+        color_discrete_sequence=['#16a34a', '#dc2626'],
+        hole=0.4
+    )
+    fig2.update_traces(textposition='inside', textinfo='percent+label', textfont_size=12)
+    fig2.update_layout(
+        font=dict(family="Poppins, sans-serif", size=14),
+        title_x=0.5,
+        showlegend=True,
+        height=400,
+        margin=dict(t=80, b=20, l=20, r=20)
+    )
+    return {'diabetes_distribution': fig1, 'heart_distribution': fig2}
+
+
+def risk_factor_figures(diabetes_stats, heart_stats):
+    # Age distribution for diabetes (pre-binned)
+    diabetes_age_hist = _outcome_labels(diabetes_stats['age_histogram'], diabetes_stats, 'Outcome')
+    fig3 = px.bar(
+        diabetes_age_hist,
+        x=(diabetes_age_hist['start'] + diabetes_age_hist['end']) / 2,
+        y='count',
+        color='Outcome',
+        title="<b>Age Distribution - Diabetes Dataset</b>",
+        color_discrete_sequence=['#16a34a', '#dc2626'],
+        labels={'Outcome': 'Diabetes Status', 'count': 'Number of Patients'}
+    )
+    fig3.update_traces(opacity=0.8)
+    fig3.update_layout(
+        font=dict(family="Poppins, sans-serif", size=12),
+        title_x=0.5,
+        xaxis_title="Age (years)",
+        yaxis_title="Number of Patients",
+        legend=dict(title="Status"),
+        height=400,
+        bargap=0.1,
+        xaxis=_age_axis(diabetes_stats)
+    )
+
+    # Age distribution for heart disease (pre-binned)
+    heart_age_hist = _outcome_labels(heart_stats['age_histogram'], heart_stats, 'target')
+    fig4 = px.bar(
+        heart_age_hist,
+        x=(heart_age_hist['start'] + heart_age_hist['end']) / 2,
+        y='count',
+        color='target',
+        title="<b>Age Distribution - Heart Disease Dataset</b>",
+        color_discrete_sequence=['#16a34a', '#dc2626'],
+        labels={'target': 'Heart Disease Status', 'count': 'Number of Patients'}
+    )
+    fig4.update_traces(opacity=0.8)
+    fig4.update_layout(
+        font=dict(family="Poppins, sans-serif", size=12),
+        title_x=0.5,
+        xaxis_title="Age (years)",
+        yaxis_title="Number of Patients",
+        legend=dict(title="Status"),
+        height=400,
+        bargap=0.1,
+        xaxis=_age_axis(heart_stats)
+    )
+
+    # BMI vs Glucose Analysis
+    fig5 = px.scatter(
+        _outcome_labels(diabetes_stats['scatter_sample'], diabetes_stats, 'Outcome'),
+        x='BMI',
+        y='Glucose',
+        color='Outcome',
+        title="<b>BMI vs Glucose Level Relationship</b>",
+        color_discrete_sequence=['#16a34a', '#dc2626'],
+        labels={'Outcome': 'Diabetes Status'},
+        hover_data=['Age', 'BloodPressure']
+    )
+    fig5.update_traces(marker=dict(size=8, opacity=0.7))
+    fig5.update_layout(
+        font=dict(family="Poppins, sans-serif", size=12),
+        title_x=0.5,
+        xaxis_title="BMI (kg/m²)",
+        yaxis_title="Glucose Level (mg/dL)",
+        legend=dict(title="Diabetes Status"),
+        height=450
+    )
+    return {'diabetes_age': fig3, 'heart_age': fig4, 'bmi_glucose': fig5}
+
+
+def correlation_figures(diabetes_stats, heart_stats):
+    # Diabetes Correlation Heatmap
+    fig6 = px.imshow(
+        diabetes_stats['corr'],
+        title="<b>Diabetes Features Correlation Matrix</b>",
+        color_continuous_scale='RdBu',
+        aspect='auto'
+    )
+    fig6.update_layout(
+        font=dict(family="Poppins, sans-serif", size=10),
+        title_x=0.5,
+        height=400,
+        margin=dict(t=60, b=20, l=20, r=20)
+    )
+
+    # Heart Disease Correlation Heatmap
+    fig7 = px.imshow(
+        heart_stats['corr'],
+        title="<b>Heart Disease Features Correlation Matrix</b>",
+        color_continuous_scale='RdBu',
+        aspect='auto'
+    )
+    fig7.update_layout(
+        font=dict(family="Poppins, sans-serif", size=10),
+        title_x=0.5,
+        height=400,
+        margin=dict(t=60, b=20, l=20, r=20)
+    )
+
+    # Diabetes correlations with outcome
+    diabetes_corr_outcome = diabetes_stats['top_correlations']
+    fig8 = px.bar(
+        x=diabetes_corr_outcome.values,
+        y=diabetes_corr_outcome.index,
+        orientation='h',
+        title="<b>Top Risk Factors - Diabetes</b>",
+        color=diabetes_corr_outcome.values,
+        color_continuous_scale='Reds',
+        labels={'x': 'Correlation with Diabetes', 'y': 'Features'}
+    )
+    fig8.update_layout(
+        font=dict(family="Poppins, sans-serif", size=12),
+        title_x=0.5,
+        height=300,
+        showlegend=False,
+        yaxis={'categoryorder': 'total ascending'}
+    )
+
+    # Heart disease correlations with target
+    heart_corr_target = heart_stats['top_correlations']
+    fig9 = px.bar(
+        x=heart_corr_target.values,
+        y=heart_corr_target.index,
+        orientation='h',
+        title="<b>Top Risk Factors - Heart Disease</b>",
+        color=heart_corr_target.values,
+        color_continuous_scale='Reds',
+        labels={'x': 'Correlation with Heart Disease', 'y': 'Features'}
+    )
+    fig9.update_layout(
+        font=dict(family="Poppins, sans-serif", size=12),
+        title_x=0.5,
+        height=300,
+        showlegend=False,
+        yaxis={'categoryorder': 'total ascending'}
+    )
+    return {'diabetes_corr': fig6, 'heart_corr': fig7, 'diabetes_top': fig8, 'heart_top': fig9}
+
+
+def demographic_figures(diabetes_stats, heart_stats):
+    # Gender distribution in heart disease dataset
+    gender_dist = heart_stats['sex_counts']
+    fig10 = px.pie(
+        values=gender_dist.values,
+        names=_count_names(gender_dist, heart_stats['sex_labels']),
+        title="<b>Gender Distribution<br>Heart Disease Dataset</b>",
+        color_discrete_sequence=['#ec4899', '#3b82f6']
+    )
+    fig10.update_traces(textposition='inside', textinfo='percent+label')
+    fig10.update_layout(
+        font=dict(family="Poppins, sans-serif", size=12),
+        title_x=0.5,
+        height=350
+    )
+
+    # Gender vs Heart Disease
+    sex_labels = heart_stats['sex_labels']
+    fig11 = px.bar(
+        _outcome_labels(heart_stats['sex_target'], heart_stats).rename(index=lambda value: _label(sex_labels, value)),
+        title="<b>Heart Disease by Gender</b>",
+        color_discrete_sequence=['#16a34a', '#dc2626'],
+        labels={'value': 'Number of Patients', 'index': 'Gender'}
+    )
+    fig11.update_layout(
+        font=dict(family="Poppins, sans-serif", size=12),
+        title_x=0.5,
+        xaxis_title="Gender",
+        yaxis_title="Number of Patients",
+        legend=dict(title="Heart Disease Status"),
+        height=350
+    )
+
+    # Diabetes by age group
+    fig12 = px.bar(
+        _outcome_labels(diabetes_stats['age_group_rates'], diabetes_stats),
+        title="<b>Diabetes Risk by Age Group (%)</b>",
+        color_discrete_sequence=['#16a34a', '#dc2626'],
+        labels={'value': 'Percentage (%)', 'index': 'Age Group'}
+    )
+    fig12.update_layout(
+        font=dict(family="Poppins, sans-serif", size=12),
+        title_x=0.5,
+        xaxis_title="Age Group",
+        yaxis_title="Percentage (%)",
+        legend=dict(title="Diabetes Status"),
+        height=350
+    )
+
+    # Heart disease by age group
+    fig13 = px.bar(
+        _outcome_labels(heart_stats['age_group_rates'], heart_stats),
+        title="<b>Heart Disease Risk by Age Group (%)</b>",
+        color_discrete_sequence=['#16a34a', '#dc2626'],
+        labels={'value': 'Percentage (%)', 'index': 'Age Group'}
+    )
+    fig13.update_layout(
+        font=dict(family="Poppins, sans-serif", size=12),
+        title_x=0.5,
+        xaxis_title="Age Group",
+        yaxis_title="Percentage (%)",
+        legend=dict(title="Heart Disease Status"),
+        height=350
+    )
+    return {'heart_gender': fig10, 'heart_by_gender': fig11, 'diabetes_age_group': fig12, 'heart_age_group': fig13}
+
+
+TAB_BUILDERS = dict(zip(TABS, [distribution_figures, risk_factor_figures, correlation_figures, demographic_figures]))
+
+
+# Figures for one tab, rebuilt only when either dataset's aggregates or
+# cohort change. The figures are shared, so callers must not update them in
+# place.
+def get_figures(tab, diabetes_stats, heart_stats):
+    key = (tab, diabetes_stats['version'], diabetes_stats['cohort'], heart_stats['version'], heart_stats['cohort'])
+    figures = _cache.get(key)
+    if figures is not None:
+        return figures
+
+    with _lock:
+        figures = _cache.get(key)
+        if figures is None:
+            figures = TAB_BUILDERS[tab](diabetes_stats, heart_stats)
+            _cache[key] = figures
+            # Drop the least recently built figures
+            while len(_cache) > FIGURE_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return figures
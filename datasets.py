@@ -0,0 +1,226 @@
+# Read-only, compact views of the bundled datasets. Each file is parsed once
+# per version (mtime and size), integer columns are downcast, the derived
+# AgeGroup column is materialized as a categorical at load, and every column
+# is backed by a non-writeable array. Callers share one frame per process and
+# any attempt to modify it raises instead of silently copying: writes into
+# the arrays fail, and the frame (a ReadOnlyFrame) refuses new, deleted or
+# renamed columns and in-place methods. Slices and copies of it are ordinary,
+# writable DataFrames.
+#
+# When pyarrow is available (it is installed with streamlit) each CSV is
+# converted once into an uncompressed Arrow IPC (Feather v2) file in
+# dataset/.cache/ with the compact dtypes below. Later loads memory-map that
+# file and read only the requested columns; it is rebuilt whenever the CSV
+# changes. Without pyarrow, or if the cache cannot be written, the CSV is
+# parsed directly.
+
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc as pa_ipc
+except ImportError:
+    pa = None
+
+working_dir = os.path.dirname(os.path.abspath(__file__))
+dataset_dir = os.path.join(working_dir, 'dataset')
+cache_dir = os.environ.get('DATASET_CACHE_DIR', os.path.join(dataset_dir, '.cache'))
+
+logger = logging.getLogger('health.datasets')
+
+DATASETS = {
+    'diabetes': {
+        'file': 'diabetes.csv',
+        'target': 'Outcome',
+        'target_labels': {0: 'No Diabetes', 1: 'Has Diabetes'},
+        'age': 'Age',
+        'age_bins': [0, 30, 45, 60, 100],
+        'age_labels': ['Under 30', '30-45', '45-60', 'Over 60'],
+        'scatter_columns': ['BMI', 'Glucose', 'Outcome', 'Age', 'BloodPressure'],
+        'dtypes': {'Pregnancies': 'int8', 'Glucose': 'int16', 'BloodPressure': 'int16', 'SkinThickness': 'int16',
+                   'Insulin': 'int16', 'BMI': 'float32', 'DiabetesPedigreeFunction': 'float32', 'Age': 'int8',
+                   'Outcome': 'int8'},
+    },
+    'heart': {
+        'file': 'heart.csv',
+        'target': 'target',
+        'target_labels': {0: 'No Disease', 1: 'Has Disease'},
+        'age': 'age',
+        'sex': 'sex',
+        'sex_labels': {0: 'Female', 1: 'Male'},
+        'age_bins': [0, 40, 55, 70, 100],
+        'age_labels': ['Under 40', '40-55', '55-70', 'Over 70'],
+        'dtypes': {'age': 'int8', 'sex': 'int8', 'cp': 'int8', 'trestbps': 'int16', 'chol': 'int16', 'fbs': 'int8',
+                   'restecg': 'int8', 'thalach': 'int16', 'exang': 'int8', 'oldpeak': 'float32', 'slope': 'int8',
+                   'ca': 'int8', 'thal': 'int8', 'target': 'int8'},
+    },
+}
+
+AGE_GROUP = 'AgeGroup'
+
+LOAD_SECONDS = metrics.histogram('dataset_load_seconds', 'Time to parse a dataset file into its view', ('dataset',))
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def dataset_path(name):
+    return os.path.join(dataset_dir, DATASETS[name]['file'])
+
+
+# Cheap identity of the file on disk; any rewrite or append changes it
+def dataset_version(name):
+    stat = os.stat(dataset_path(name))
+    return stat.st_mtime_ns, stat.st_size
+
+
+# A DataFrame whose columns cannot be added, removed, replaced or renamed.
+# Derived frames (selections, copies, results) are plain DataFrames.
+class ReadOnlyFrame(pd.DataFrame):
+
+    @property
+    def _constructor(self):
+        return pd.DataFrame
+
+    def _refuse(self, *args, **kwargs):
+        raise TypeError('Shared dataset views are read-only; modify a .copy() instead')
+
+    # _update_inplace backs every inplace=True method; .loc enlargement
+    # replaces _mgr, and public attributes would shadow columns
+    __setitem__ = __delitem__ = insert = _update_inplace = _refuse
+
+    def __setattr__(self, name, value):
+        if name == '_mgr' or not name.startswith('_'):
+            self._refuse()
+        super().__setattr__(name, value)
+
+
+def _read_only(values):
+    values = np.ascontiguousarray(values)
+    values.flags.writeable = False
+    return values
+
+
+# Smallest integer type that holds the column, float32 for measurements
+def _compact(series):
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+    if pd.api.types.is_float_dtype(series):
+        return series.astype(np.float32)
+    return series
+
+
+def build_view(name, df, columns=None):
+    config = DATASETS[name]
+    if columns is None:
+        columns = list(df.columns) + [AGE_GROUP]
+
+    view = {}
+    for column in columns:
+        if column == AGE_GROUP:
+            age_codes = pd.cut(df[config['age']], bins=config['age_bins'], labels=config['age_labels']).cat.codes
+            view[column] = pd.Categorical.from_codes(
+                _read_only(age_codes.to_numpy()), categories=config['age_labels'], ordered=True)
+        else:
+            view[column] = _read_only(_compact(df[column]).to_numpy())
+    return ReadOnlyFrame(view, copy=False)
+
+
+def columnar_path(name):
+    return os.path.join(cache_dir, f'{name}.arrow')
+
+
+# Convert the CSV to the columnar cache file, streaming record batches so
+# the whole file never has to fit in memory. Values that do not fit the
+# configured dtypes raise pyarrow.ArrowInvalid.
+def build_columnar(name):
+    version = dataset_version(name)
+    column_types = {column: pa.type_for_alias(dtype) for column, dtype in DATASETS[name]['dtypes'].items()}
+    reader = pa_csv.open_csv(
+        dataset_path(name),
+        parse_options=pa_csv.ParseOptions(delimiter=';'),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types),
+    )
+    schema = reader.schema.with_metadata({'source_version': json.dumps(version)})
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = columnar_path(name)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink, pa_ipc.new_file(sink, schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def _open_columnar(name):
+    path = columnar_path(name)
+    if not os.path.exists(path):
+        return None
+    table = pa_ipc.open_file(pa.memory_map(path)).read_all()
+    source_version = (table.schema.metadata or {}).get(b'source_version')
+    if source_version is None or tuple(json.loads(source_version)) != dataset_version(name):
+        return None
+    return table
+
+
+# Read the dataset from the columnar cache, building it first if it is
+# missing or older than the CSV. Only the requested columns are converted.
+def read_columnar(name, usecols=None):
+    table = _open_columnar(name)
+    if table is None:
+        build_columnar(name)
+        table = _open_columnar(name)
+    if usecols is not None:
+        table = table.select([column for column in table.column_names if column in usecols])
+    return table.to_pandas()
+
+
+# Load the file, reading only the columns needed for the requested view
+def load_dataset(name, columns=None):
+    usecols = None
+    if columns is not None:
+        usecols = [column for column in columns if column != AGE_GROUP]
+        age = DATASETS[name]['age']
+        if AGE_GROUP in columns and age not in usecols:
+            usecols.append(age)
+
+    if pa is not None:
+        try:
+            return build_view(name, read_columnar(name, usecols), columns)
+        except (OSError, pa.ArrowException) as e:
+            logger.warning('Columnar cache unavailable for %s, reading the CSV: %s', name, e)
+    df = pd.read_csv(dataset_path(name), sep=';', usecols=usecols)
+    return build_view(name, df, columns)
+
+
+# Shared read-only view of a dataset, re-read only when the file changes.
+# 'columns' prunes the view to what the caller needs; the AgeGroup column
+# can be requested like any other.
+def get_dataset(name, columns=None):
+    key = (name, tuple(columns) if columns is not None else None)
+    version = dataset_version(name)
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with _lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != version:
+            with LOAD_SECONDS.time(name):
+                cached = (version, load_dataset(name, columns))
+            _cache[key] = cached
+    return cached[1]
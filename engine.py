@@ -0,0 +1,511 @@
+# Headless prediction engine: input parsing, feature order, model lookup and
+# predict. No Streamlit or plotting imports so it can be used from workers,
+# scripts and the app alike.
+
+import bisect
+import math
+import os
+import pickle
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+import artifacts
+import kernels
+import metrics
+from prediction_cache import PredictionCache
+from scheduler import MicroBatcher
+
+working_dir = os.path.dirname(os.path.abspath(__file__))
+models_dir = os.path.join(working_dir, 'saved_models')
+
+DISEASES = ['diabetes', 'heart']
+MODEL_NAMES = ['Logistic Regression', 'Random Forest', 'SVM']
+ENSEMBLE = 'All Models (Ensemble)'
+
+# Feature order expected by the models (same as the dataset columns)
+FEATURE_COLUMNS = {
+    'diabetes': ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 'Insulin',
+                 'BMI', 'DiabetesPedigreeFunction', 'Age'],
+    'heart': ['age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach',
+              'exang', 'oldpeak', 'slope', 'ca', 'thal'],
+}
+
+MODEL_FILES = {
+    'diabetes': {'Logistic Regression': 'logistic_regression.pkl',
+                 'Random Forest': 'random_forest.pkl',
+                 'SVM': 'svm.pkl'},
+    'heart': {'Logistic Regression': 'logistic_regression1.pkl',
+              'Random Forest': 'random_forest1.pkl',
+              'SVM': 'svm1.pkl'},
+}
+
+# Results of single predictions, shared by every session in the process.
+# Size and lifetime can be tuned with PREDICTION_CACHE_SIZE / PREDICTION_CACHE_TTL (seconds).
+prediction_cache = PredictionCache(
+    max_size=int(os.environ.get('PREDICTION_CACHE_SIZE', 4096)),
+    ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 3600)),
+)
+
+MODEL_LOAD_SECONDS = metrics.histogram(
+    'model_load_seconds', 'Time to load one model on first use', ('disease', 'model'))
+PARSE_SECONDS = metrics.histogram(
+    'input_parse_seconds', 'Time to turn form or request values into a feature vector', ('disease',))
+PREDICT_SECONDS = metrics.histogram(
+    'prediction_seconds', 'Prediction latency; single rows include cache lookups', ('disease', 'model', 'mode'))
+PREDICTED_ROWS = metrics.counter(
+    'predicted_rows_total', 'Rows scored by the models (cache hits excluded)', ('disease', 'model'))
+
+# Triage levels by calibrated probability of disease. RISK_CUTOFFS holds the
+# probabilities where MODERATE and HIGH start; override with e.g.
+# RISK_CUTOFFS=0.2,0.6 for a more sensitive screen.
+RISK_LEVELS = ['LOW', 'MODERATE', 'HIGH']
+
+
+def check_cutoffs(cutoffs):
+    try:
+        cutoffs = [float(c) for c in cutoffs]
+    except (TypeError, ValueError):
+        raise ValueError('Risk cut-offs must be numbers')
+    if len(cutoffs) != len(RISK_LEVELS) - 1 or cutoffs != sorted(cutoffs) or not 0 <= cutoffs[0] <= cutoffs[-1] <= 1:
+        raise ValueError(f"Expected {len(RISK_LEVELS) - 1} increasing risk cut-offs between 0 and 1")
+    return cutoffs
+
+
+RISK_CUTOFFS = check_cutoffs(os.environ.get('RISK_CUTOFFS', '0.3,0.7').split(','))
+
+# Models are loaded on first use per (disease, model) key and kept for the
+# life of the process; each key has its own lock so two sessions asking for
+# the same model wait for one load instead of loading it twice.
+_models = {}
+_load_locks = {}
+_registry_lock = threading.Lock()
+
+
+class ModelLoadError(Exception):
+    pass
+
+
+def check_key(disease, model_choice=None):
+    if disease not in FEATURE_COLUMNS:
+        raise ValueError(f"Unknown disease '{disease}', expected one of: {', '.join(DISEASES)}")
+    if model_choice is not None and model_choice not in MODEL_FILES[disease]:
+        raise ValueError(f"Unknown model '{model_choice}', expected one of: {', '.join(MODEL_NAMES)}")
+
+
+# Models are served by the NumPy kernels in kernels.py. Prefer the compact
+# artifact in saved_models/compact/ (mmap'd arrays, no pickle); fall back to
+# unpickling the sklearn model and compiling it when it has not been exported.
+def load_model(disease, model_choice):
+    check_key(disease, model_choice)
+    model_file = MODEL_FILES[disease][model_choice]
+    compact_path = artifacts.artifact_path(model_file)
+    if os.path.isdir(compact_path):
+        try:
+            return artifacts.load_artifact(compact_path)
+        except (artifacts.ArtifactError, kernels.KernelError, OSError, ValueError) as e:
+            raise ModelLoadError(f"Could not load {compact_path}: {e}") from e
+
+    path = os.path.join(models_dir, model_file)
+    try:
+        with open(path, 'rb') as f:
+            estimator = pickle.load(f)
+        kernel = kernels.compile_model(estimator)
+        if kernel.kind != 'forest':
+            artifacts.reference_fields(kernel, estimator, *reference_data(disease))
+        return kernel
+    except Exception as e:
+        raise ModelLoadError(f"Could not load {path}: {e}") from e
+
+
+# (features, outcomes) of the bundled dataset, which the SVMs' probability
+# calibration and the linear models' contribution baselines are fitted on
+def reference_data(disease):
+    import datasets
+
+    target = datasets.DATASETS[disease]['target']
+    df = datasets.get_dataset(disease, FEATURE_COLUMNS[disease] + [target])
+    return df[FEATURE_COLUMNS[disease]].to_numpy(dtype=float), df[target].to_numpy()
+
+
+def get_model(disease, model_choice):
+    key = (disease, model_choice)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    check_key(disease, model_choice)
+    with _registry_lock:
+        lock = _load_locks.setdefault(key, threading.Lock())
+    with lock:
+        if key not in _models:
+            with MODEL_LOAD_SECONDS.time(disease, model_choice):
+                _models[key] = load_model(disease, model_choice)
+    return _models[key]
+
+
+def loaded_models():
+    return sorted(_models)
+
+
+# Load every model eagerly and return them as {disease: {model: estimator}}
+def load_models():
+    return {disease: {name: get_model(disease, name) for name in MODEL_NAMES} for disease in DISEASES}
+
+
+# Load the given (disease, model) keys, by default all models for one disease
+# or all six, on a daemon thread so the first prediction does not pay for
+# loading them (mapping the compact artifacts, or unpickling the models that
+# have not been exported). Load errors are left for the foreground get_model
+# call to report.
+def warm_up(disease=None, keys=None, background=True):
+    if keys is None:
+        diseases = [disease] if disease else DISEASES
+        keys = [(d, name) for d in diseases for name in MODEL_NAMES]
+    keys = [key for key in keys if key not in _models]
+    if not keys:
+        return None
+
+    def load_all():
+        for key in keys:
+            try:
+                get_model(*key)
+            except (ModelLoadError, ValueError):
+                pass
+
+    if not background:
+        load_all()
+        return None
+    thread = threading.Thread(target=load_all, name='model-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+# Turn form values into the model's feature vector. Accepts a list in feature
+# order, where blanks become 0.0 like the app form, or a dict keyed by feature
+# name, which must name every feature and nothing else (null marks a blank) so
+# a misspelled key is not silently scored as 0.0. Anything non-numeric, NaN or
+# infinite raises ValueError.
+def parse_input(disease, values):
+    check_key(disease)
+    start = time.perf_counter()
+    columns = FEATURE_COLUMNS[disease]
+    if isinstance(values, dict):
+        unknown = [str(key) for key in values if key not in columns]
+        missing = [column for column in columns if column not in values]
+        if unknown or missing:
+            problems = ([f"unknown {', '.join(unknown)}"] if unknown else []) + \
+                       ([f"missing {', '.join(missing)}"] if missing else [])
+            raise ValueError(f"Feature names for {disease}: {'; '.join(problems)}. Give every one of "
+                             f"{', '.join(columns)} by name, null for a blank")
+        user_input = [0.0 if values[c] is None else float(values[c]) for c in columns]
+    elif isinstance(values, (list, tuple, np.ndarray)):
+        if len(values) != len(columns):
+            raise ValueError(f"Expected {len(columns)} values for {disease}, got {len(values)}")
+        user_input = [float(x) if x else 0.0 for x in values]
+    else:
+        raise ValueError(f"Expected the {disease} features as a list in feature order or keyed by feature name")
+    if not all(map(math.isfinite, user_input)):
+        raise ValueError('Feature values must be finite numbers')
+    PARSE_SECONDS.observe(time.perf_counter() - start, disease)
+    return user_input
+
+
+# (n_rows, n_features) matrix for rows in any form parse_input accepts. Rows
+# of plain numbers convert in one vectorized call; anything else (dicts,
+# blanks, non-finite values) is parsed row by row for parse_input's handling
+# and error messages, prefixed with the row's index.
+def parse_rows(disease, rows):
+    check_key(disease)
+    shape = (len(rows), len(FEATURE_COLUMNS[disease]))
+    try:
+        matrix = np.asarray(rows, dtype=float)
+    except (TypeError, ValueError):
+        matrix = None
+    if matrix is not None and matrix.shape == shape and np.isfinite(matrix).all():
+        return matrix
+    parsed = []
+    for i, row in enumerate(rows):
+        try:
+            parsed.append(parse_input(disease, row))
+        except (TypeError, ValueError) as e:
+            raise type(e)(f"Row {i}: {e}") from e
+    return np.array(parsed).reshape(shape)
+
+
+def risk_level(probability, cutoffs=None):
+    return RISK_LEVELS[bisect.bisect_right(RISK_CUTOFFS if cutoffs is None else cutoffs, probability)]
+
+
+def risk_levels(probabilities, cutoffs=None):
+    cutoffs = RISK_CUTOFFS if cutoffs is None else cutoffs
+    return np.array(RISK_LEVELS)[np.searchsorted(cutoffs, probabilities, side='right')]
+
+
+def predict(disease, model_choice, values, use_cache=True):
+    return _score_parsed(disease, model_choice, parse_input(disease, values), use_cache)[0]
+
+
+# One input's label with its calibrated probability and triage level:
+#   {'prediction': 0/1, 'probability': P(disease), 'risk_level': 'LOW'|'MODERATE'|'HIGH'}
+def score(disease, model_choice, values, cutoffs=None, use_cache=True):
+    label, probability = _score_parsed(disease, model_choice, parse_input(disease, values), use_cache)
+    return {'prediction': label, 'probability': probability, 'risk_level': risk_level(probability, cutoffs)}
+
+
+# (label, probability) for one parsed input; the cache keeps both
+def _score_parsed(disease, model_choice, user_input, use_cache=True):
+    start = time.perf_counter()
+    if use_cache:
+        key = prediction_cache.make_key(disease, model_choice, user_input)
+        result = prediction_cache.get_or_compute(key, lambda: _score_row(disease, model_choice, user_input))
+    else:
+        result = _score_row(disease, model_choice, user_input)
+    PREDICT_SECONDS.observe(time.perf_counter() - start, disease, model_choice, 'row')
+    return result
+
+
+def _score_row(disease, model_choice, user_input):
+    result = get_model(disease, model_choice).score_row(user_input)
+    PREDICTED_ROWS.inc(disease, model_choice)
+    return result
+
+
+_ensemble_pool = None
+
+
+def _timed_score(disease, model_choice, user_input, use_cache):
+    start = time.perf_counter()
+    result = _score_parsed(disease, model_choice, user_input, use_cache)
+    return result, (time.perf_counter() - start) * 1000
+
+
+# Run all three models on one input and combine them. With parallel=True the
+# forests (the only models that take more than a few microseconds) are
+# scored on a worker thread while the linear models run inline. Returns
+#   {'votes': {model: 0/1}, 'latency_ms': {model: ms},
+#    'vote_share': share of models voting high risk, 'majority': 0/1,
+#    'probabilities': {model: P(disease)}, 'probability': their mean,
+#    'risk_level': triage level of probability}
+# 'probability' and 'risk_level' mean the same as for a single model (see
+# score()).
+def predict_all(disease, values, parallel=False, use_cache=True, cutoffs=None):
+    global _ensemble_pool
+    user_input = parse_input(disease, values)
+
+    pending = {}
+    if parallel:
+        if _ensemble_pool is None:
+            _ensemble_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ensemble')
+        for model_choice in MODEL_NAMES:
+            if get_model(disease, model_choice).kind == 'forest':
+                pending[model_choice] = _ensemble_pool.submit(
+                    _timed_score, disease, model_choice, user_input, use_cache)
+
+    votes, probabilities, latency_ms = {}, {}, {}
+    for model_choice in MODEL_NAMES:
+        if model_choice in pending:
+            result, latency_ms[model_choice] = pending[model_choice].result()
+        else:
+            result, latency_ms[model_choice] = _timed_score(disease, model_choice, user_input, use_cache)
+        votes[model_choice], probabilities[model_choice] = result
+
+    positive = sum(votes.values())
+    probability = sum(probabilities.values()) / len(probabilities)
+    return {
+        'votes': votes,
+        'latency_ms': latency_ms,
+        'vote_share': positive / len(votes),
+        'majority': int(positive * 2 > len(votes)),
+        'probabilities': probabilities,
+        'probability': probability,
+        'risk_level': risk_level(probability, cutoffs),
+    }
+
+
+def _check_rows(disease, rows):
+    rows = np.asarray(rows, dtype=float)
+    if rows.ndim != 2 or rows.shape[1] != len(FEATURE_COLUMNS[disease]):
+        raise ValueError(f"Expected rows with {len(FEATURE_COLUMNS[disease])} features for {disease}")
+    if not np.isfinite(rows).all():
+        raise ValueError('Feature values must be finite numbers')
+    return rows
+
+
+# Score an (n_rows, n_features) matrix already in feature order
+def predict_batch(disease, model_choice, rows):
+    rows = _check_rows(disease, rows)
+    model = get_model(disease, model_choice)
+    with PREDICT_SECONDS.time(disease, model_choice, 'batch'):
+        labels = model.predict(rows).astype(int)
+    PREDICTED_ROWS.inc(disease, model_choice, amount=len(rows))
+    return labels
+
+
+# (int labels, probabilities of disease) for a matrix, from the same model
+# pass; sort by probability to rank patients by risk
+def score_batch(disease, model_choice, rows):
+    rows = _check_rows(disease, rows)
+    model = get_model(disease, model_choice)
+    with PREDICT_SECONDS.time(disease, model_choice, 'batch'):
+        labels, probabilities = model.score(rows)
+    PREDICTED_ROWS.inc(disease, model_choice, amount=len(rows))
+    return labels.astype(int), probabilities
+
+
+# Per-feature contributions for a matrix: (base, (n_rows, n_features)
+# contributions) adding up to each row's model output. Linear models explain
+# the log-odds (SVMs their decision value) relative to the training-set
+# means, forests the probability of disease; get_model(...).contribution_units
+# says which.
+def explain_batch(disease, model_choice, rows):
+    rows = _check_rows(disease, rows)
+    model = get_model(disease, model_choice)
+    with PREDICT_SECONDS.time(disease, model_choice, 'explain'):
+        return model.contributions(rows)
+
+
+# One input's explanation, features ordered by the size of their effect:
+#   {'units': ..., 'base': output at the baseline, 'output': base + contributions,
+#    'contributions': {feature: contribution}}
+def explain(disease, model_choice, values):
+    user_input = parse_input(disease, values)
+    base, contributions = explain_batch(disease, model_choice, [user_input])
+    contributions = contributions[0]
+    order = np.argsort(-np.abs(contributions), kind='stable')
+    return {
+        'units': get_model(disease, model_choice).contribution_units,
+        'base': base,
+        'output': base + float(contributions.sum()),
+        'contributions': {FEATURE_COLUMNS[disease][i]: float(contributions[i]) for i in order},
+    }
+
+
+def explain_all(disease, values):
+    return {model_choice: explain(disease, model_choice, values) for model_choice in MODEL_NAMES}
+
+
+# Scheduler batch function: one (label, probability) pair per row
+def _score_pairs(disease, model_choice, rows):
+    labels, probabilities = score_batch(disease, model_choice, rows)
+    return list(zip(labels.tolist(), probabilities.tolist()))
+
+
+# Single-row requests from concurrent callers are coalesced per (disease,
+# model) and scored as one matrix. The window and batch limit can be tuned
+# with PREDICTION_BATCH_WINDOW_MS / PREDICTION_MAX_BATCH.
+BATCH_WINDOW = float(os.environ.get('PREDICTION_BATCH_WINDOW_MS', 2)) / 1000
+MAX_BATCH = int(os.environ.get('PREDICTION_MAX_BATCH', 256))
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = MicroBatcher(
+                    lambda key, rows: _score_pairs(key[0], key[1], rows),
+                    window=BATCH_WINDOW,
+                    max_batch=MAX_BATCH,
+                    name='prediction-batch',
+                )
+    return _scheduler
+
+
+# Route submit() through another scheduler, e.g. one that scores in a
+# process pool. The previous scheduler finishes its queued rows and stops.
+def set_scheduler(scheduler):
+    global _scheduler
+    with _scheduler_lock:
+        previous, _scheduler = _scheduler, scheduler
+    if previous is not None:
+        previous.close(wait=False)
+
+
+# Queue one input on the micro-batching scheduler and return a Future for
+# its (0/1 label, probability). Cached inputs resolve immediately; fresh
+# results are cached when their batch completes.
+def submit(disease, model_choice, values, use_cache=True):
+    check_key(disease, model_choice)
+    user_input = parse_input(disease, values)
+    if not use_cache:
+        return get_scheduler().submit((disease, model_choice), user_input)
+
+    key = prediction_cache.make_key(disease, model_choice, user_input)
+    found, result = prediction_cache.get(key)
+    if found:
+        future = Future()
+        future.set_result(result)
+        return future
+
+    def store(done):
+        if done.exception() is None:
+            prediction_cache.put(key, done.result())
+
+    future = get_scheduler().submit((disease, model_choice), user_input)
+    future.add_done_callback(store)
+    return future
+
+
+# Cache and scheduler counters are kept by those objects; export them as-is
+def _collect_metrics():
+    cache = prediction_cache.stats()
+    families = [
+        ('prediction_cache_hits_total', 'counter', 'Prediction cache hits', (), [('prediction_cache_hits_total', (), cache['hits'])]),
+        ('prediction_cache_misses_total', 'counter', 'Prediction cache misses', (), [('prediction_cache_misses_total', (), cache['misses'])]),
+        ('prediction_cache_evictions_total', 'counter', 'Prediction cache LRU evictions', (), [('prediction_cache_evictions_total', (), cache['evictions'])]),
+        ('prediction_cache_size', 'gauge', 'Entries in the prediction cache', (), [('prediction_cache_size', (), cache['size'])]),
+        ('models_loaded', 'gauge', 'Models loaded in this process', (), [('models_loaded', (), len(_models))]),
+    ]
+    if _scheduler is not None:
+        stats = _scheduler.stats()
+        buckets, cumulative = [], 0
+        for bound, count in stats['batch_sizes'].items():
+            cumulative += count
+            buckets.append(('scheduler_batch_size_bucket', (str(bound),), cumulative))
+        families += [
+            ('scheduler_requests_total', 'counter', 'Rows queued on the micro-batching scheduler', (),
+             [('scheduler_requests_total', (), stats['requests'])]),
+            ('scheduler_queued', 'gauge', 'Rows waiting in the scheduler', (), [('scheduler_queued', (), stats['queued'])]),
+            ('scheduler_batch_size', 'histogram', 'Rows per scheduler batch', ('le',),
+             buckets + [('scheduler_batch_size_sum', (), _scheduler.scored_rows),
+                        ('scheduler_batch_size_count', (), stats['batches'])]),
+            ('scheduler_queue_wait_seconds', 'summary', 'Time rows wait before their batch is scored (recent rows)', ('quantile',),
+             [('scheduler_queue_wait_seconds', ('0.5',), stats['queue_wait_p50_ms'] / 1000),
+              ('scheduler_queue_wait_seconds', ('0.99',), stats['queue_wait_p99_ms'] / 1000)]),
+        ]
+    return families
+
+
+metrics.add_collector(_collect_metrics)
+
+
+# python engine.py heart "Random Forest" 63 1 3 145 233 1 0 150 0 2.3 0 0 1
+def main(argv):
+    if len(argv) < 3:
+        print('usage: python engine.py <diabetes|heart> "<model>" <feature values...>')
+        return 1
+    disease, model_choice, values = argv[0], argv[1], argv[2:]
+
+    start = time.perf_counter()
+    get_model(disease, model_choice)
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = score(disease, model_choice, values)
+    predict_time = time.perf_counter() - start
+
+    print(f"{disease} / {model_choice}: {'HIGH RISK' if result['prediction'] == 1 else 'LOW RISK'} "
+          f"({result['prediction']}), probability {result['probability']:.1%} ({result['risk_level']})")
+    print(f"model load {load_time * 1000:.1f} ms, predict {predict_time * 1000:.3f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
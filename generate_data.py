@@ -0,0 +1,142 @@
+# Synthetic versions of the bundled datasets at any size, for load testing
+# the analytics page and batch scoring. A Gaussian copula is fitted to the
+# source file: each column keeps its own empirical distribution (integer
+# columns only take values seen in the source, measurements are interpolated
+# between observed quantiles and rounded to the source precision) and the
+# rank correlations between columns, the outcome included, are preserved.
+# Rows are generated and written in chunks, so memory use does not depend on
+# the number of rows.
+#
+#   python generate_data.py heart 10000000 dataset/heart_10m.csv
+#   python generate_data.py diabetes 1000000 /tmp/diabetes_1m.csv --seed 7
+#
+# Needs scipy (installed with scikit-learn) for the normal CDF.
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+import datasets
+
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Rounds of latent-correlation calibration and the sample size each uses
+CALIBRATION_ROUNDS = 6
+CALIBRATION_ROWS = 50_000
+
+
+class CopulaModel:
+
+    def __init__(self, df):
+        self.columns = list(df.columns)
+        self.sorted_values = [np.sort(df[c].to_numpy(dtype=float)) for c in self.columns]
+        self.is_integer = [pd.api.types.is_integer_dtype(df[c]) for c in self.columns]
+        self.decimals = [0 if integer else _decimals(values)
+                         for integer, values in zip(self.is_integer, self.sorted_values)]
+
+        # Start from the correlation of the normal scores of the ranks. Ties
+        # in the binary and small-integer columns shrink the correlations the
+        # copula reproduces, so the latent matrix is then corrected until a
+        # sample's rank correlations match the source's.
+        target = _rank_corr(df.to_numpy(dtype=float))
+        scores = ndtri(df.rank(method='average').to_numpy() / (len(df) + 1))
+        latent = _clean_corr(np.corrcoef(scores, rowvar=False))
+        self.cholesky = _cholesky(latent)
+        rng = np.random.default_rng(0)
+        for _ in range(CALIBRATION_ROUNDS):
+            sampled = _rank_corr(self.sample(CALIBRATION_ROWS, rng).to_numpy(dtype=float))
+            latent = _clean_corr(np.clip(latent + target - sampled, -0.999, 0.999))
+            self.cholesky = _cholesky(latent)
+
+    # One DataFrame of 'rows' synthetic rows with the source schema
+    def sample(self, rows, rng):
+        z = rng.standard_normal((rows, len(self.columns))) @ self.cholesky.T
+        u = ndtr(z)
+        data = {}
+        for i, column in enumerate(self.columns):
+            values = self.sorted_values[i]
+            if self.is_integer[i]:
+                # Inverse empirical CDF: only values present in the source
+                index = np.minimum((u[:, i] * len(values)).astype(np.intp), len(values) - 1)
+                data[column] = values[index].astype(np.int64)
+            else:
+                position = u[:, i] * (len(values) - 1)
+                data[column] = np.round(np.interp(position, np.arange(len(values)), values), self.decimals[i])
+        return pd.DataFrame(data, columns=self.columns)
+
+
+# Spearman correlation matrix of the columns of X
+def _rank_corr(X):
+    return _clean_corr(np.corrcoef(pd.DataFrame(X).rank(method='average').to_numpy(), rowvar=False))
+
+
+def _clean_corr(corr):
+    corr = np.nan_to_num(corr, nan=0.0)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+# Fewest decimals that represent every value in the column (max 6)
+def _decimals(values):
+    for decimals in range(7):
+        if np.allclose(values, np.round(values, decimals), rtol=0, atol=1e-9):
+            return decimals
+    return 6
+
+
+# Cholesky factor of a correlation matrix, nudged towards the identity when
+# rounding leaves it not quite positive definite
+def _cholesky(corr):
+    for shrink in (0.0, 1e-6, 1e-4, 1e-2, 1e-1):
+        try:
+            return np.linalg.cholesky((1 - shrink) * corr + shrink * np.eye(len(corr)))
+        except np.linalg.LinAlgError:
+            continue
+    return np.eye(len(corr))
+
+
+def fit(name, source=None):
+    return CopulaModel(pd.read_csv(source or datasets.dataset_path(name), sep=';'))
+
+
+# Yield DataFrames of at most chunk_rows rows, rows in total
+def generate(name, rows, seed=0, chunk_rows=DEFAULT_CHUNK_ROWS, source=None):
+    model = fit(name, source)
+    rng = np.random.default_rng(seed)
+    for start in range(0, rows, chunk_rows):
+        yield model.sample(min(chunk_rows, rows - start), rng)
+
+
+# Stream a synthetic dataset to a ';'-separated file and return its path
+def write_csv(name, rows, path, seed=0, chunk_rows=DEFAULT_CHUNK_ROWS, source=None):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        for i, chunk in enumerate(generate(name, rows, seed, chunk_rows, source)):
+            chunk.to_csv(f, sep=';', index=False, header=i == 0)
+    return path
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Generate a synthetic diabetes or heart dataset of any size.')
+    parser.add_argument('dataset', choices=list(datasets.DATASETS))
+    parser.add_argument('rows', type=int)
+    parser.add_argument('output', help="output file, ';' separated like dataset/*.csv")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--source', help='file to fit instead of the bundled dataset')
+    args = parser.parse_args(argv)
+
+    if args.rows < 1 or args.chunk_rows < 1:
+        parser.error('rows and --chunk-rows must be positive')
+    write_csv(args.dataset, args.rows, args.output, args.seed, args.chunk_rows, args.source)
+    print(f"{args.rows:,} {args.dataset} rows written to {args.output} ({os.path.getsize(args.output) / 2**20:.1f} MB)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
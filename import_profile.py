@@ -0,0 +1,91 @@
+# Import-time profile of the app's entry points. Each entry point's imports
+# run in a fresh interpreter under python -X importtime, and the time is
+# summed per top-level package. Pages are profiled on top of what every page
+# already imports, so each report shows only what visiting that page adds.
+# --check fails when the prediction pages import one of HEAVY_PACKAGES, e.g.
+# after a module-level 'import pandas' sneaks back into app3.py's imports.
+#
+#   python import_profile.py
+#   python import_profile.py --top 20 --check
+
+import argparse
+import os
+import subprocess
+import sys
+
+working_dir = os.path.dirname(os.path.abspath(__file__))
+
+# What app3.py imports before drawing any page
+STARTUP_MODULES = ['streamlit', 'streamlit_option_menu', 'assets', 'engine', 'metrics', 'recommendations']
+
+# (name, modules already imported, modules profiled). Streamlit is profiled
+# on its own: it imports part of plotly itself, for its chart theme.
+PROFILES = [
+    ('streamlit', [], ['streamlit']),
+    ('prediction pages', ['streamlit'], STARTUP_MODULES[1:]),
+    ('Data Analytics page', STARTUP_MODULES, ['analytics', 'charts']),
+    ('Batch Prediction page', STARTUP_MODULES, ['batch_predict']),
+    ('JSON server', [], ['server']),
+]
+
+# Packages the prediction pages must not add to streamlit's own imports
+HEAVY_PACKAGES = ['pandas', 'plotly', 'pyarrow', 'scipy', 'sklearn', 'matplotlib', 'seaborn']
+
+MARKER = 'import_profile: start'
+
+
+# [(package, self seconds, cumulative seconds, is top level)] for the
+# modules first imported by 'modules' after 'preloaded'
+def profile(preloaded, modules):
+    code = ''.join(f'import {module}\n' for module in preloaded)
+    code += f'import sys\nsys.stderr.write({MARKER!r} + "\\n")\n'
+    code += ''.join(f'import {module}\n' for module in modules)
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=working_dir,
+                               capture_output=True, text=True)
+    if completed.returncode:
+        raise RuntimeError(f"Importing {', '.join(modules)} failed:\n{completed.stderr[-2000:]}")
+
+    lines = completed.stderr.splitlines()
+    entries = []
+    for line in lines[lines.index(MARKER) + 1:]:
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        entries.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6,
+                        len(name) - len(name.lstrip())))
+    top_indent = min((indent for *_, indent in entries), default=0)
+    return [(name, self_s, cumulative_s, indent == top_indent) for name, self_s, cumulative_s, indent in entries]
+
+
+def summarize(entries):
+    packages = {}
+    for name, self_s, _, _ in entries:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0.0) + self_s
+    total = sum(cumulative_s for _, _, cumulative_s, top in entries if top)
+    return total, sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Profile the import time of the app's entry points.")
+    parser.add_argument('--top', type=int, default=10, help='packages listed per entry point')
+    parser.add_argument('--check', action='store_true',
+                        help='exit with status 1 if the prediction pages import a heavy package')
+    args = parser.parse_args(argv)
+
+    status = 0
+    for name, preloaded, modules in PROFILES:
+        total, packages = summarize(profile(preloaded, modules))
+        heavy = [package for package, _ in packages if package in HEAVY_PACKAGES]
+        print(f"\n{name} (import {', '.join(modules)}): {total * 1000:.0f} ms")
+        for package, seconds in packages[:args.top]:
+            print(f"  {package:<28} {seconds * 1000:8.1f} ms")
+        if heavy:
+            print(f"  heavy packages: {', '.join(heavy)}")
+        if args.check and name == 'prediction pages' and heavy:
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
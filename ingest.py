@@ -0,0 +1,89 @@
+# Streaming ingestion for exports too large to load at once. The file is read
+# in chunks; each chunk updates the analytics aggregates and can optionally be
+# scored (see batch_predict.add_scores) and appended to an output file, so
+# memory use depends on the chunk size only.
+#
+#   python ingest.py heart export.csv --summary summary.json
+#   python ingest.py diabetes export.csv --score "Random Forest" --output scored.csv
+
+import argparse
+import json
+import sys
+
+import analytics
+from batch_predict import add_scores, validate_chunk
+from engine import FEATURE_COLUMNS, MODEL_NAMES, check_key
+
+
+# Aggregate a file and, with model_choice, write every chunk with the
+# Prediction, Probability and RiskLevel columns appended to 'output' (a path
+# or open text file).
+# Returns (aggregates, number of rows predicted high risk or None).
+def ingest(disease, source, chunksize=analytics.STREAM_CHUNK_ROWS, model_choice=None, output=None):
+    check_key(disease, model_choice)
+    if model_choice is not None and output is None:
+        raise ValueError('An output file is needed to score while ingesting')
+
+    state = {'rows': 0, 'positives': 0}
+    out = open(output, 'w', newline='') if isinstance(output, str) else output
+
+    def score(chunk):
+        features = validate_chunk(chunk, disease, state['rows'])
+        chunk = add_scores(chunk, features, disease, model_choice)
+        chunk.to_csv(out, sep=';', index=False, header=state['rows'] == 0)
+        state['rows'] += len(chunk)
+        state['positives'] += int(chunk['Prediction'].sum())
+
+    try:
+        aggregates = analytics.stream_aggregates(disease, source, chunksize,
+                                                 on_chunk=score if model_choice is not None else None)
+    finally:
+        if isinstance(output, str):
+            out.close()
+    return aggregates, state['positives'] if model_choice is not None else None
+
+
+# JSON-friendly summary of the aggregates
+def summarize(aggregates):
+    return {
+        'dataset': aggregates['name'],
+        'rows': aggregates['rows'],
+        'skipped_rows': aggregates['skipped_rows'],
+        'positive': aggregates['positive'],
+        'risk_rate': round(aggregates['risk_rate'], 3),
+        'top_correlations': {k: round(float(v), 4) for k, v in aggregates['top_correlations'].items()},
+        'age_group_rates': {str(k): round(float(v), 3) for k, v in aggregates['age_group_rates'].iloc[:, -1].items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregate (and optionally score) a large CSV export in chunks.')
+    parser.add_argument('disease', choices=sorted(FEATURE_COLUMNS))
+    parser.add_argument('input', help="';'-separated file shaped like dataset/diabetes.csv or dataset/heart.csv")
+    parser.add_argument('--chunksize', type=int, default=analytics.STREAM_CHUNK_ROWS)
+    parser.add_argument('--score', metavar='MODEL', choices=MODEL_NAMES, help='also score every chunk with this model')
+    parser.add_argument('--output', help='where to write the scored rows (with --score)')
+    parser.add_argument('--summary', help='write the summary as JSON to this file')
+    args = parser.parse_args()
+
+    if args.score and not args.output:
+        parser.error('--score needs --output')
+
+    try:
+        aggregates, positives = ingest(args.disease, args.input, args.chunksize, args.score, args.output)
+    except (ValueError, KeyError) as e:
+        parser.exit(1, f"Invalid input file: {e}\n")
+
+    summary = summarize(aggregates)
+    if positives is not None:
+        summary['predicted_high_risk'] = positives
+        summary['model'] = args.score
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=2)
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,585 @@
+# Pure-NumPy inference kernels compiled from the fitted sklearn models.
+#
+# A kernel holds only the arrays needed for prediction: a dot product for
+# logistic regression and linear SVMs, a vectorized kernel evaluation over the
+# support vectors for other SVMs, and a flattened node table of all trees for
+# random forests, scored with a bitvector lookup of every tree's exit leaf at
+# once. The same arrays are what artifacts.py writes to disk, so a kernel can
+# be built from a fitted estimator (compile_model) or from mmap'd .npy files
+# (artifacts.load_artifact).
+#
+# score() returns the labels together with the probability of the positive
+# class, both derived from the one decision or leaf-value pass: the logistic
+# function for logistic regression, the mean leaf value for forests, and a
+# Platt sigmoid for SVMs (see fit_platt; the saved SVMs were trained without
+# probability=True), fitted at export on cross-validated decision values.
+#
+# contributions() splits each row's output into a base value plus one term
+# per feature that add up to it exactly: coef * (x - baseline) on the
+# decision value for linear models, where baseline is the training-set mean
+# stored at export, and the Saabas tree-path decomposition of the positive
+# class probability for forests.
+#
+#   python kernels.py verify     # compare against the pickled sklearn models
+
+import bisect
+import os
+import sys
+import time
+
+import numpy as np
+
+# Rows per forest lookup; bounds the (rows, trees, words) bitset buffers,
+# which are fastest while they stay within the CPU caches
+FOREST_CHUNK_ROWS = 512
+# Rows per level-by-level walk when computing forest contributions
+FOREST_WALK_ROWS = 8192
+
+
+class KernelError(Exception):
+    pass
+
+
+# Logistic function without overflow warnings for large |x|
+def expit(x):
+    return np.exp(-np.logaddexp(0.0, -x))
+
+
+# Platt scaling: P(positive | score) = 1 / (1 + exp(a * score + b)), fitted
+# by Newton's method with backtracking on the regularized targets of Platt
+# (1999), following Lin, Lin and Weng (2007). Returns (a, b).
+def fit_platt(scores, y, max_iter=100, min_step=1e-10, sigma=1e-12, eps=1e-5):
+    scores = np.asarray(scores, dtype=np.float64)
+    y = np.asarray(y, dtype=bool)
+    positives = int(y.sum())
+    negatives = len(y) - positives
+    target = np.where(y, (positives + 1.0) / (positives + 2.0), 1.0 / (negatives + 2.0))
+
+    def loss(a, b):
+        z = scores * a + b
+        return float((np.logaddexp(0.0, z) - (1.0 - target) * z).sum())
+
+    a, b = 0.0, float(np.log((negatives + 1.0) / (positives + 1.0)))
+    value = loss(a, b)
+    for _ in range(max_iter):
+        p = expit(-(scores * a + b))
+        d1 = target - p
+        d2 = p * (1.0 - p)
+        g_a, g_b = float(scores @ d1), float(d1.sum())
+        if abs(g_a) < eps and abs(g_b) < eps:
+            break
+        h_aa = float(scores ** 2 @ d2) + sigma
+        h_bb = float(d2.sum()) + sigma
+        h_ab = float(scores @ d2)
+        det = h_aa * h_bb - h_ab * h_ab
+        d_a = -(h_bb * g_a - h_ab * g_b) / det
+        d_b = -(-h_ab * g_a + h_aa * g_b) / det
+        descent = g_a * d_a + g_b * d_b
+        step = 1.0
+        while step >= min_step:
+            new_value = loss(a + step * d_a, b + step * d_b)
+            if new_value < value + 1e-4 * step * descent:
+                a, b, value = a + step * d_a, b + step * d_b, new_value
+                break
+            step /= 2.0
+        else:
+            break
+    return a, b
+
+
+class LinearKernel:
+    kind = 'linear'
+    contribution_units = 'log-odds'
+
+    def __init__(self, arrays, manifest):
+        self.manifest = manifest
+        self.classes_ = np.asarray(manifest['classes'])
+        self.n_features = manifest['n_features']
+        self.coef = arrays['coef']
+        self.intercept = arrays['intercept']
+        self.baseline = np.asarray(manifest.get('baseline') or np.zeros(self.n_features), dtype=np.float64)
+        # Plain floats for the single-row path, which skips numpy entirely
+        self._coef_row = [float(c) for c in self.coef[0]]
+        self._intercept_row = float(self.intercept[0])
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        return (X @ self.coef.T + self.intercept).ravel()
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(np.intp)]
+
+    def decision_row(self, row):
+        score = self._intercept_row
+        for c, x in zip(self._coef_row, row):
+            score += c * x
+        return score
+
+    def predict_row(self, row):
+        return int(self.classes_[1] if self.decision_row(row) > 0 else self.classes_[0])
+
+    # Probability of classes_[1] for decision values
+    def probability(self, scores):
+        return expit(scores)
+
+    def predict_proba(self, X):
+        p = self.probability(self.decision_function(X))
+        return np.column_stack([1.0 - p, p])
+
+    # (labels, probability of classes_[1]) from one decision pass
+    def score(self, X):
+        scores = self.decision_function(X)
+        return self.classes_[(scores > 0).astype(np.intp)], self.probability(scores)
+
+    def score_row(self, row):
+        score = self.decision_row(row)
+        return (int(self.classes_[1] if score > 0 else self.classes_[0]),
+                float(self.probability(np.float64(score))))
+
+    # (base, (n_rows, n_features) contributions) with
+    # base + contributions.sum(axis=1) == decision_function(X)
+    def contributions(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        coef = self.coef[0]
+        return float(self.intercept[0] + coef @ self.baseline), (X - self.baseline) * coef
+
+    # Store the training-set feature means that contributions are measured from
+    def set_baseline(self, X):
+        self.baseline = np.asarray(X, dtype=np.float64).mean(axis=0)
+        self.manifest = {**self.manifest, 'baseline': self.baseline.tolist()}
+        return self.manifest['baseline']
+
+
+# Linear SVMs are collapsed to their primal weights at export and share the
+# LinearKernel code path; other kernels are evaluated against the support vectors.
+class SVCKernel(LinearKernel):
+    kind = 'svc'
+    contribution_units = 'decision value'
+
+    def __init__(self, arrays, manifest):
+        self.params = manifest['params']
+        self.calibration = manifest.get('calibration')
+        if self.params['kernel'] == 'linear':
+            super().__init__(arrays, manifest)
+            return
+        self.manifest = manifest
+        self.classes_ = np.asarray(manifest['classes'])
+        self.n_features = manifest['n_features']
+        self.support_vectors = arrays['support_vectors']
+        self.dual_coef = arrays['dual_coef']
+        self.intercept = arrays['intercept']
+        self._sv_sq_norms = (self.support_vectors ** 2).sum(axis=1)
+
+    def kernel(self, X):
+        kernel = self.params['kernel']
+        gamma = self.params['gamma']
+        dot = X @ self.support_vectors.T
+        if kernel == 'rbf':
+            sq_dist = (X ** 2).sum(axis=1)[:, np.newaxis] + self._sv_sq_norms - 2.0 * dot
+            return np.exp(-gamma * np.maximum(sq_dist, 0.0))
+        if kernel == 'poly':
+            return (gamma * dot + self.params['coef0']) ** self.params['degree']
+        if kernel == 'sigmoid':
+            return np.tanh(gamma * dot + self.params['coef0'])
+        raise KernelError(f"Unsupported SVC kernel '{kernel}'")
+
+    def decision_function(self, X):
+        if self.params['kernel'] == 'linear':
+            return super().decision_function(X)
+        X = np.asarray(X, dtype=np.float64)
+        return (self.kernel(X) @ self.dual_coef.T + self.intercept).ravel()
+
+    def decision_row(self, row):
+        if self.params['kernel'] == 'linear':
+            return super().decision_row(row)
+        return float(self.decision_function([row])[0])
+
+    # Fit the Platt sigmoid on decision values of rows that the model scoring
+    # them was not trained on ('folds'-fold out-of-fold values, see
+    # artifacts.cross_val_decisions) and keep it in the manifest, where
+    # artifacts.py saves it
+    def calibrate(self, scores, y, folds):
+        a, b = fit_platt(scores, np.asarray(y) == self.classes_[1])
+        self.calibration = {'method': 'platt', 'cv_folds': folds, 'a': a, 'b': b, 'rows': len(scores)}
+        self.manifest = {**self.manifest, 'calibration': self.calibration}
+        return self.calibration
+
+    def probability(self, scores):
+        if self.calibration is None:
+            raise KernelError('SVM has no probability calibration; re-run python artifacts.py export')
+        return expit(-(self.calibration['a'] * scores + self.calibration['b']))
+
+    def contributions(self, X):
+        if self.params['kernel'] != 'linear':
+            raise KernelError(f"Feature contributions are not available for {self.params['kernel']} SVMs")
+        return super().contributions(X)
+
+
+# All trees concatenated into one node table. children[node] holds the global
+# (left, right) node ids and leaves point to themselves, so a step is always
+# node = children[node, x[feature[node]] > threshold[node]] with no branching.
+class ForestKernel:
+    kind = 'forest'
+    contribution_units = 'probability'
+
+    def __init__(self, arrays, manifest):
+        self.manifest = manifest
+        self.classes_ = np.asarray(manifest['classes'])
+        self.n_features = manifest['n_features']
+        self.max_depth = manifest['params']['max_depth']
+        self.roots = arrays['roots']
+        self.children = arrays['children']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        # Exit-leaf lookup tables, see forest_lookup
+        self.split_threshold = arrays['split_threshold']
+        self.split_start = arrays['split_start']
+        self.split_masks = arrays['split_masks']
+        self.leaf_ids = arrays['leaf_ids']
+        # Views on the (possibly shared, mmap'd) artifact arrays; the only
+        # per-process copy is the one-byte-per-node leaf mask. bisect reads the
+        # thresholds through memoryviews, which hand out Python floats without
+        # copying the mapped array.
+        self._children_flat = self.children.reshape(-1)
+        self._is_leaf = self.children[:, 0] == np.arange(len(self.feature))
+        bounds = self.split_start.tolist()
+        self._splits = [self.split_threshold[a:b] for a, b in zip(bounds, bounds[1:])]
+        self._split_views = [memoryview(split) for split in self._splits]
+        # Row of split_masks holding each feature's empty prefix
+        self._mask_offsets = [a + f for f, a in enumerate(bounds[:-1])]
+        self._leaf_slots = np.arange(len(self.roots)) * 64 * self.split_masks.shape[-1]
+
+    # Exit leaf per tree from the (..., n_trees, words) bitsets of leaves no
+    # split ruled out: the lowest set bit of the first nonzero word, isolated
+    # with bits & -bits and located by its float64 exponent (exact for powers
+    # of two). 'out' (intp) and 'bits' and 'spare' (uint64) are buffers of
+    # shape alive.shape[:-1]; see _chunk_leaves for why they are passed in.
+    def _exit_leaves(self, alive, out, bits, spare):
+        words = alive.shape[-1]
+        np.copyto(bits, alive[..., words - 1])
+        out.fill(64 * (words - 1))
+        for word in range(words - 2, -1, -1):
+            nonzero = alive[..., word] != 0
+            np.copyto(bits, alive[..., word], where=nonzero)
+            np.copyto(out, 64 * word, where=nonzero)
+        np.negative(bits, out=spare)
+        np.bitwise_and(bits, spare, out=bits)
+        np.copyto(spare.view(np.float64), bits)
+        np.right_shift(spare, np.uint64(52), out=spare)
+        out += spare.view(np.intp)
+        out += self._leaf_slots - 1023
+        return self.leaf_ids.take(out, out=out)
+
+    # Leaf node ids for each FOREST_CHUNK_ROWS-row chunk of X, as (start,
+    # (rows, n_trees) leaves). The buffers are allocated once and reused for
+    # every chunk: fresh ones per chunk get page faulted in again each time
+    # the allocator returns the freed memory to the OS, which costs more than
+    # the lookup itself.
+    def _chunk_leaves(self, X):
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        n_trees, words = self.split_masks.shape[1:]
+        rows = min(len(X), FOREST_CHUNK_ROWS)
+        found = np.empty((rows, n_trees, words), dtype=np.uint64)
+        alive = np.empty_like(found)
+        leaves = np.empty((rows, n_trees), dtype=np.intp)
+        bits = np.empty((rows, n_trees), dtype=np.uint64)
+        spare = np.empty_like(bits)
+        for start in range(0, len(X), FOREST_CHUNK_ROWS):
+            chunk = X[start:start + FOREST_CHUNK_ROWS]
+            n = len(chunk)
+            for f, (column, split, offset) in enumerate(zip(chunk.T, self._splits, self._mask_offsets)):
+                index = np.searchsorted(split, column)
+                index += offset
+                if f == 0:
+                    self.split_masks.take(index, axis=0, out=alive[:n])
+                else:
+                    np.bitwise_and(alive[:n], self.split_masks.take(index, axis=0, out=found[:n]), out=alive[:n])
+            yield start, self._exit_leaves(alive[:n], leaves[:n], bits[:n], spare[:n])
+
+    # Leaf node id reached by each row in each tree, shape (n_rows, n_trees)
+    def apply(self, X):
+        leaves = np.empty((len(X), len(self.roots)), dtype=np.intp)
+        for start, chunk in self._chunk_leaves(X):
+            leaves[start:start + len(chunk)] = chunk
+        return leaves
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2:
+            raise KernelError('Expected a 2-D feature matrix')
+        proba = np.empty((len(X), self.value.shape[1]))
+        values = np.empty((min(len(X), FOREST_CHUNK_ROWS), len(self.roots), self.value.shape[1]))
+        for start, leaves in self._chunk_leaves(X):
+            proba[start:start + len(leaves)] = self._average(leaves, values[:len(leaves)])
+        return proba
+
+    # Mean leaf value over trees; cumsum adds the trees in order, matching
+    # the way sklearn accumulates its per-tree probabilities. 'values' is an
+    # optional buffer for the gathered leaf values.
+    def _average(self, leaves, values=None):
+        values = self.value.take(leaves, axis=0, out=values)
+        np.cumsum(values, axis=-2, out=values)
+        return values[..., -1, :] / len(self.roots)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def score(self, X):
+        proba = self.predict_proba(X)
+        return self.classes_[np.argmax(proba, axis=1)], proba[:, 1]
+
+    # One row: the same lookup with bisect, which beats numpy's per-call
+    # overhead for a handful of features
+    def apply_row(self, row):
+        x = np.asarray(row, dtype=np.float32).astype(np.float64).tolist()
+        index = [bisect.bisect_left(split, value) + offset
+                 for split, value, offset in zip(self._split_views, x, self._mask_offsets)]
+        alive = np.bitwise_and.reduce(self.split_masks[index], axis=0)
+        return self._exit_leaves(alive, np.empty(len(self.roots), dtype=np.intp),
+                                 np.empty(len(self.roots), dtype=np.uint64), np.empty(len(self.roots), dtype=np.uint64))
+
+    def predict_proba_row(self, row):
+        return self._average(self.apply_row(row))
+
+    def predict_row(self, row):
+        return int(self.classes_[np.argmax(self.predict_proba_row(row))])
+
+    def score_row(self, row):
+        proba = self.predict_proba_row(row)
+        return int(self.classes_[np.argmax(proba)]), float(proba[1])
+
+    # Saabas decomposition: every split moves the positive class probability
+    # from the parent's value to the child's, and that change is credited to
+    # the split feature. Averaged over trees, base (the mean root value) plus
+    # the contributions equals predict_proba(X)[:, 1].
+    def contributions(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2:
+            raise KernelError('Expected a 2-D feature matrix')
+        positive = self.value[:, 1]
+        out = np.empty((len(X), self.n_features))
+        for start in range(0, len(X), FOREST_WALK_ROWS):
+            out[start:start + FOREST_WALK_ROWS] = self._path_contributions(X[start:start + FOREST_WALK_ROWS], positive)
+        return float(positive[self.roots].mean()), out
+
+    # Walks the (tree, row) pairs down level by level, dropping them once they
+    # reach a leaf, and sums each step's change in value into a flat
+    # (row, feature) table with one bincount per level
+    def _path_contributions(self, X, positive):
+        X = X.astype(np.float64)
+        n_rows = len(X)
+        columns = X.T.reshape(-1)
+        node = np.repeat(self.roots.astype(np.intp), n_rows)
+        row = np.tile(np.arange(n_rows, dtype=np.intp), len(self.roots))
+        totals = np.zeros(n_rows * self.n_features)
+        for _ in range(self.max_depth):
+            active = ~self._is_leaf[node]
+            if not active.all():
+                node, row = node[active], row[active]
+                if not len(node):
+                    break
+            feature = self.feature[node]
+            go_right = columns[feature * n_rows + row] > self.threshold[node]
+            child = self._children_flat[2 * node + go_right]
+            totals += np.bincount(row * self.n_features + feature, weights=positive[child] - positive[node],
+                                  minlength=len(totals))
+            node = child
+        return totals.reshape(n_rows, self.n_features) / len(self.roots)
+
+
+KERNEL_TYPES = {cls.kind: cls for cls in (LinearKernel, SVCKernel, ForestKernel)}
+
+
+# Exit-leaf lookup tables for bitvector evaluation of all trees at once
+# (QuickScorer, Lucchese et al. 2015), from the node table arrays. sklearn
+# numbers each tree's nodes depth first, left child first, so a tree's leaves
+# are in left-to-right order by node id and the leaves of a left subtree form
+# a contiguous range. A split that sends x right rules out its left subtree's
+# leaves; ANDing those masks over every split that sends the row right leaves
+# the exit leaf as the lowest bit set.
+#
+# A split sends x right when threshold < x, which holds for a prefix of that
+# feature's splits sorted by threshold, so the AND over each prefix is
+# precomputed. split_threshold holds each feature's sorted thresholds from
+# split_start[f] to split_start[f + 1], and split_masks[split_start[f] + f + k]
+# the per-tree bitsets of leaves left after the first k of them. leaf_ids
+# maps tree * 64 * words + leaf rank back to a node id. The masks take
+# (splits + features) * trees * words * 8 bytes, 17 MB for the diabetes
+# forest, so they are built here at export and mmap'd like the other arrays.
+def forest_lookup(roots, children, feature, threshold, n_features):
+    n_nodes = len(feature)
+    left, right = children[:, 0], children[:, 1]
+    is_leaf = left == np.arange(n_nodes)
+    internal = np.flatnonzero(~is_leaf)
+    if (left[internal] != internal + 1).any():
+        raise KernelError('Forest nodes are not numbered depth first')
+    roots = roots.astype(np.intp)
+    tree = np.repeat(np.arange(len(roots)), np.diff(np.append(roots, n_nodes)))
+    # Leaves before each node id within its tree
+    rank = np.concatenate([[0], np.cumsum(is_leaf)])[:-1]
+    rank -= rank[roots][tree]
+    words = (int(np.bincount(tree, weights=is_leaf).max()) + 63) // 64
+    leaves = np.flatnonzero(is_leaf)
+    leaf_ids = np.zeros(len(roots) * 64 * words, dtype=np.intp)
+    leaf_ids[tree[leaves] * 64 * words + rank[leaves]] = leaves
+
+    bit = np.arange(64 * words)
+    ruled_out = (bit >= rank[left[internal]][:, None]) & (bit < rank[right[internal]][:, None])
+    split_masks = np.packbits(~ruled_out, axis=1, bitorder='little').view(np.uint64)
+
+    thresholds, tables = [], []
+    for f in range(n_features):
+        split = np.flatnonzero(feature[internal] == f)
+        split = split[np.argsort(threshold[internal[split]], kind='stable')]
+        table = np.full((len(split) + 1, len(roots), words), np.uint64(2 ** 64 - 1))
+        table[np.arange(1, len(split) + 1), tree[internal[split]]] = split_masks[split]
+        np.bitwise_and.accumulate(table, axis=0, out=table)
+        thresholds.append(threshold[internal[split]])
+        tables.append(table)
+    return {'split_threshold': np.concatenate(thresholds),
+            'split_start': np.cumsum([0] + [len(t) for t in thresholds]).astype(np.int64),
+            'split_masks': np.concatenate(tables),
+            'leaf_ids': leaf_ids}
+
+
+# Pull the prediction arrays out of a fitted estimator, laid out the way the
+# kernels use them. Returns (manifest fields, arrays).
+def extract(estimator):
+    name = type(estimator).__name__
+    params = {}
+    if name == 'LogisticRegression':
+        kind = 'linear'
+        arrays = {'coef': estimator.coef_, 'intercept': estimator.intercept_}
+    elif name == 'SVC':
+        kind = 'svc'
+        params = {'kernel': estimator.kernel, 'gamma': float(estimator._gamma),
+                  'coef0': float(estimator.coef0), 'degree': int(estimator.degree)}
+        if estimator.kernel == 'linear':
+            arrays = {'coef': estimator.coef_, 'intercept': estimator.intercept_}
+        else:
+            arrays = {'support_vectors': estimator.support_vectors_,
+                      'dual_coef': estimator.dual_coef_,
+                      'intercept': estimator.intercept_}
+    elif name == 'RandomForestClassifier':
+        kind = 'forest'
+        trees = [tree.tree_ for tree in estimator.estimators_]
+        sizes = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        children, features = [], []
+        for tree, offset in zip(trees, offsets):
+            ids = np.arange(tree.node_count) + offset
+            leaf = tree.children_left == -1
+            children.append(np.column_stack([
+                np.where(leaf, ids, tree.children_left + offset),
+                np.where(leaf, ids, tree.children_right + offset),
+            ]))
+            # Leaves have feature -2; point them at column 0 so lookups stay in range
+            features.append(np.where(leaf, 0, tree.feature))
+        # Normalize node values the same way DecisionTreeClassifier.predict_proba does
+        value = np.concatenate([tree.value[:, 0, :] for tree in trees])
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        params = {'max_depth': int(max(tree.max_depth for tree in trees))}
+        arrays = {'roots': offsets.astype(np.int32),
+                  'children': np.concatenate(children).astype(np.intp),
+                  'feature': np.concatenate(features).astype(np.intp),
+                  'threshold': np.concatenate([tree.threshold for tree in trees]),
+                  'value': value / normalizer}
+        arrays.update(forest_lookup(arrays['roots'], arrays['children'], arrays['feature'],
+                                    arrays['threshold'], estimator.n_features_in_))
+    else:
+        raise KernelError(f"Cannot compile model of type {name}")
+
+    feature_names = getattr(estimator, 'feature_names_in_', None)
+    manifest = {
+        'kind': kind,
+        'estimator': name,
+        'n_features': int(estimator.n_features_in_),
+        'feature_names': [str(f) for f in feature_names] if feature_names is not None else None,
+        'classes': [int(c) for c in estimator.classes_],
+        'params': params,
+    }
+    return manifest, {key: np.ascontiguousarray(value) for key, value in arrays.items()}
+
+
+def build(arrays, manifest):
+    if manifest.get('kind') not in KERNEL_TYPES:
+        raise KernelError(f"Unknown kernel kind {manifest.get('kind')!r}")
+    return KERNEL_TYPES[manifest['kind']](arrays, manifest)
+
+
+def compile_model(estimator):
+    manifest, arrays = extract(estimator)
+    return build(arrays, manifest)
+
+
+# Compare a kernel with its sklearn model: (labels identical, max score difference).
+# The labels from score() must match too.
+def verify_against_sklearn(estimator, kernel, X):
+    X = np.asarray(X, dtype=np.float64)
+    labels = estimator.predict(X)
+    labels_match = bool((labels == kernel.predict(X)).all() and (labels == kernel.score(X)[0]).all())
+    if kernel.kind == 'forest':
+        diff = np.abs(estimator.predict_proba(X) - kernel.predict_proba(X)).max()
+    else:
+        diff = np.abs(estimator.decision_function(X) - kernel.decision_function(X)).max()
+        if kernel.kind == 'linear':
+            diff = max(diff, np.abs(estimator.predict_proba(X) - kernel.predict_proba(X)).max())
+    return labels_match, float(diff)
+
+
+def time_per_call(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+# Check every saved model on its dataset (plus jittered copies) and report
+# single-row latency against sklearn
+def verify_all():
+    import pickle
+    import warnings
+
+    import pandas as pd
+
+    from engine import FEATURE_COLUMNS, MODEL_FILES, load_model, models_dir, working_dir
+
+    warnings.filterwarnings('ignore', category=UserWarning)
+    rng = np.random.default_rng(0)
+    ok = True
+    for disease, files in MODEL_FILES.items():
+        df = pd.read_csv(os.path.join(working_dir, 'dataset', f'{disease}.csv'), sep=';')
+        X = df[FEATURE_COLUMNS[disease]].to_numpy(dtype=np.float64)
+        X = np.vstack([X, X * rng.uniform(0.8, 1.2, X.shape), np.round(X * rng.uniform(0.5, 1.5, X.shape))])
+        row = X[0].tolist()
+        for model_choice, model_file in files.items():
+            with open(os.path.join(models_dir, model_file), 'rb') as f:
+                estimator = pickle.load(f)
+            # The kernel the engine serves: the exported artifact when present
+            kernel = load_model(disease, model_choice)
+            labels_match, diff = verify_against_sklearn(estimator, kernel, X)
+            row_match = all(kernel.predict_row(r) == kernel.predict([r])[0] for r in X[:200].tolist())
+            base, contributions = kernel.contributions(X)
+            output = kernel.predict_proba(X)[:, 1] if kernel.kind == 'forest' else kernel.decision_function(X)
+            additive = bool(np.allclose(base + contributions.sum(axis=1), output))
+            ok = ok and labels_match and row_match and additive
+
+            sklearn_us = time_per_call(lambda: estimator.predict([row]), 50) * 1e6
+            kernel_us = time_per_call(lambda: kernel.predict_row(row), 500) * 1e6
+            sklearn_ms = time_per_call(lambda: estimator.predict(X), 5) * 1e3
+            kernel_ms = time_per_call(lambda: kernel.predict(X), 5) * 1e3
+            print(f"{disease:9} {model_choice:20} {kernel.kind:7} labels {'ok' if labels_match and row_match else 'MISMATCH'}"
+                  f"  contributions {'ok' if additive else 'MISMATCH'}"
+                  f"  max diff {diff:.2e}  row: sklearn {sklearn_us:7.1f} us  kernel {kernel_us:6.1f} us"
+                  f"  {len(X)} rows: sklearn {sklearn_ms:6.2f} ms  kernel {kernel_ms:6.2f} ms")
+    return ok
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['verify']:
+        print('usage: python kernels.py verify')
+        sys.exit(1)
+    sys.exit(0 if verify_all() else 1)
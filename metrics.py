@@ -0,0 +1,207 @@
+# Process-wide counters and latency histograms for the hot paths (model
+# loading, input parsing, prediction, dataset loading, app reruns), rendered
+# in the Prometheus text exposition format. Everything lives in memory; the
+# JSON server exposes it at /metrics, the app can write it to the file named
+# by METRICS_FILE after every rerun (for a node_exporter textfile collector),
+# and the optional Admin page shows it in the sidebar menu.
+
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans the ~1 us linear models up to multi-second batch files
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, label_values, (), value) for label_values, value in sorted(self._values.items())]
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+        # label values -> [per-bucket counts, sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def label_sets(self):
+        with self._lock:
+            return sorted(self._series)
+
+    # {'count', 'sum', 'mean', 'p50', 'p90', 'p99'} for one label set
+    def summary(self, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                return {'count': 0, 'sum': 0.0, 'mean': 0.0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0}
+            counts, total, count = list(series[0]), series[1], series[2]
+        return {
+            'count': count,
+            'sum': total,
+            'mean': total / count,
+            **{f'p{int(q * 100)}': self._quantile(q, counts, count) for q in (0.5, 0.9, 0.99)},
+        }
+
+    # Linear interpolation inside the bucket holding the q-th observation,
+    # as Prometheus' histogram_quantile does
+    def _quantile(self, q, counts, count):
+        rank = q * count
+        cumulative = 0
+        for i, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i]
+                if upper == math.inf:
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return 0.0
+
+    def samples(self):
+        with self._lock:
+            series = {label_values: (list(s[0]), s[1], s[2]) for label_values, s in self._series.items()}
+        samples = []
+        for label_values, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append((f'{self.name}_bucket', label_values, (('le', _format_value(bound)),), cumulative))
+            samples.append((f'{self.name}_sum', label_values, (), total))
+            samples.append((f'{self.name}_count', label_values, (), count))
+        return samples
+
+
+class Registry:
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labels != metric.labels:
+                    raise ValueError(f"Metric '{metric.name}' is already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    # collect() is called at render time and returns a list of
+    # (name, type, documentation, labels, [(sample name, label values, value)])
+    # for values that are owned elsewhere, e.g. the prediction cache counters.
+    def add_collector(self, collect):
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for sample_name, label_values, extra, value in metric.samples():
+                lines.append(f'{sample_name}{_format_labels(metric.labels, label_values, extra)} {_format_value(value)}')
+
+        for collect in collectors:
+            for name, kind, documentation, labels, samples in collect():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                for sample_name, label_values, value in samples:
+                    lines.append(f'{sample_name}{_format_labels(labels, label_values)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    # Write render() to path atomically, so a scraper never reads half a file
+    def write_textfile(self, path):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+REGISTRY = Registry()
+
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+add_collector = REGISTRY.add_collector
+render = REGISTRY.render
+
+METRICS_FILE = os.environ.get('METRICS_FILE')
+
+
+def write_textfile(path=None):
+    path = path or METRICS_FILE
+    if path:
+        REGISTRY.write_textfile(path)
@@ -0,0 +1,74 @@
+# Process-wide LRU cache for single predictions. Streamlit reruns the script
+# on every widget change but imported modules stay loaded, so one cache
+# instance is shared by all sessions served by the process.
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+
+    def __init__(self, max_size=4096, ttl=3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Cache key for one input vector. Values are compared as floats, so '1',
+    # 1 and 1.0 share an entry; adding 0.0 folds -0.0 into 0.0.
+    @staticmethod
+    def make_key(disease, model_choice, features):
+        return disease, model_choice, tuple(float(x) + 0.0 for x in features)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # Return the cached value for key, or compute, store and return it.
+    # compute() runs outside the lock so slow models do not block other keys.
+    def get_or_compute(self, key, compute):
+        found, value = self.get(key)
+        if found:
+            return value
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
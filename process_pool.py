@@ -0,0 +1,182 @@
+# Multi-process scoring. Worker processes load every model from the compact
+# artifacts in saved_models/compact/, whose arrays (including the forests'
+# lookup tables) are mmap'd read-only, so all workers (and the parent) map
+# the same page-cache pages instead of each unpickling its own copy of the
+# forests and SVMs. Loading and warming all six models adds about 0.3 MB of
+# anonymous memory to a worker, mostly the one-byte-per-node forest leaf
+# masks, plus the buffers of the batch it is scoring. Each worker scores a
+# row with every model when it starts, so the pages are mapped in before the
+# first request. Requests are sent to the pool as (disease, model,
+# rows) and come back as int label arrays, or as (labels, probabilities) from
+# the score methods.
+#
+# Metrics recorded in a worker stay in that worker's registry, which /metrics
+# never sees, so workers send the time spent scoring back with each result
+# and the parent records prediction_seconds and predicted_rows_total.
+#
+#   python process_pool.py --processes 4    # load the pool and report memory per worker
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import numpy as np
+
+import artifacts
+import engine
+from scheduler import MicroBatcher
+
+
+# Models must come from the compact artifacts; a pickle fallback would give
+# every worker a private copy of each model.
+def check_artifacts():
+    missing = [model_file for files in engine.MODEL_FILES.values() for model_file in files.values()
+               if not os.path.isdir(artifacts.artifact_path(model_file))]
+    if missing:
+        raise engine.ModelLoadError(
+            f"Compact artifacts missing for {', '.join(missing)}; run 'python artifacts.py export' first")
+
+
+# Load every model and score a row with each, so the first request a worker
+# takes does not pay for faulting in the artifact pages
+def _init_worker():
+    for disease, models in engine.load_models().items():
+        row = np.zeros((1, len(engine.FEATURE_COLUMNS[disease])))
+        for model_choice in models:
+            engine.score_batch(disease, model_choice, row)
+
+
+# Worker side: (result, seconds spent scoring)
+def _predict_batch(disease, model_choice, rows):
+    start = time.perf_counter()
+    labels = engine.predict_batch(disease, model_choice, rows)
+    return labels, time.perf_counter() - start
+
+
+def _score_batch(disease, model_choice, rows):
+    start = time.perf_counter()
+    scores = engine.score_batch(disease, model_choice, rows)
+    return scores, time.perf_counter() - start
+
+
+# Future for the result of a worker future, resolved once the worker's
+# timing and row count are recorded in this process
+def _recorded(future, disease, model_choice, n_rows):
+    recorded = Future()
+
+    def record(done):
+        try:
+            result, seconds = done.result()
+        except BaseException as e:
+            recorded.set_exception(e)
+            return
+        engine.PREDICT_SECONDS.observe(seconds, disease, model_choice, 'batch')
+        engine.PREDICTED_ROWS.inc(disease, model_choice, amount=n_rows)
+        recorded.set_result(result)
+
+    future.add_done_callback(record)
+    return recorded
+
+
+def _worker_memory():
+    # Hold the worker briefly so the other probes land on other processes
+    time.sleep(0.2)
+    return os.getpid(), memory_usage()
+
+
+# Resident, private (mapped by this process alone) and anonymous (heap)
+# memory of this process in KB, from /proc/self/smaps_rollup. Artifact pages
+# count as private until a second process maps them; anonymous memory is what
+# each process adds on its own. Returns {} where that file is not available.
+def memory_usage():
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+    except OSError:
+        return {}
+    private = sum(int(fields.get(key, '0 kB').split()[0]) for key in ('Private_Clean', 'Private_Dirty'))
+    return {'rss_kb': int(fields['Rss'].split()[0]), 'private_kb': private,
+            'shared_kb': int(fields['Rss'].split()[0]) - private,
+            'anonymous_kb': int(fields.get('Anonymous', '0 kB').split()[0])}
+
+
+class ProcessPredictor:
+
+    # Workers are spawned rather than forked so they start from a clean
+    # interpreter even when the parent is running server threads.
+    def __init__(self, processes=None, start_method='spawn'):
+        check_artifacts()
+        self.processes = processes or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+        )
+
+    # Future for the int labels of an (n_rows, n_features) matrix
+    def submit(self, disease, model_choice, rows):
+        engine.check_key(disease, model_choice)
+        rows = np.asarray(rows, dtype=float)
+        return _recorded(self._executor.submit(_predict_batch, disease, model_choice, rows),
+                         disease, model_choice, len(rows))
+
+    def predict_batch(self, disease, model_choice, rows):
+        return self.submit(disease, model_choice, rows).result()
+
+    # Future for (int labels, probabilities), see engine.score_batch
+    def submit_scores(self, disease, model_choice, rows):
+        engine.check_key(disease, model_choice)
+        rows = np.asarray(rows, dtype=float)
+        return _recorded(self._executor.submit(_score_batch, disease, model_choice, rows),
+                         disease, model_choice, len(rows))
+
+    def score_batch(self, disease, model_choice, rows):
+        return self.submit_scores(disease, model_choice, rows).result()
+
+    def _score_pairs(self, disease, model_choice, rows):
+        labels, probabilities = self.score_batch(disease, model_choice, rows)
+        return list(zip(labels.tolist(), probabilities.tolist()))
+
+    # Micro-batching scheduler that scores its batches in the pool, one
+    # batch in flight per worker process. Results match engine.submit's.
+    def make_scheduler(self, window=0.002, max_batch=256):
+        return MicroBatcher(lambda key, rows: self._score_pairs(key[0], key[1], rows),
+                            window=window, max_batch=max_batch, workers=self.processes,
+                            name='process-batch')
+
+    # {pid: memory_usage()} for the workers (best effort while busy)
+    def worker_memory(self):
+        futures = [self._executor.submit(_worker_memory) for _ in range(self.processes)]
+        return dict(future.result() for future in futures)
+
+    def close(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Start a scoring process pool and report its memory use.')
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    try:
+        pool = ProcessPredictor(args.processes)
+    except engine.ModelLoadError as e:
+        parser.exit(1, f'{e}\n')
+    try:
+        for disease in engine.DISEASES:
+            for model_choice in engine.MODEL_NAMES:
+                pool.predict_batch(disease, model_choice, np.zeros((1, len(engine.FEATURE_COLUMNS[disease]))))
+        for pid, usage in sorted(pool.worker_memory().items()):
+            print(f"worker {pid}: rss {usage.get('rss_kb', 0) / 1024:.1f} MB, "
+                  f"private {usage.get('private_kb', 0) / 1024:.1f} MB, shared {usage.get('shared_kb', 0) / 1024:.1f} MB, "
+                  f"anonymous {usage.get('anonymous_kb', 0) / 1024:.1f} MB")
+    finally:
+        pool.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
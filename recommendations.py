@@ -0,0 +1,204 @@
+# Health recommendations for the prediction pages and the JSON server.
+#
+# static/recommendations.json holds, per disease, the general advice card for
+# each risk level and band rules on the input values, e.g.
+#   {"feature": "Glucose", "min": 140, "max": 200, "level": "warning", ...}
+# Bands are half-open [min, max) and a missing bound is unbounded. Features
+# with a "missing" value (0 for the diabetes measurements, as in the dataset)
+# skip their rules when the value was not recorded.
+#
+# The rules are indexed once per process: every feature gets its sorted band
+# edges and the rules that apply between each pair of edges, so matching a
+# row is one bisect per feature however many rules there are. recommend()
+# returns the matched findings with the card, and renders both to HTML
+# (styled by app.css), plain text or a JSON-ready dict.
+#
+#   python recommendations.py heart 63 1 3 145 233 1 0 150 0 2.3 0 0 1 --high
+#   python recommendations.py diabetes 6 148 72 35 0 33.6 0.627 50 --format html
+
+import argparse
+import bisect
+import functools
+import html
+import json
+import math
+import os
+import sys
+
+import engine
+
+working_dir = os.path.dirname(os.path.abspath(__file__))
+data_path = os.path.join(working_dir, 'static', 'recommendations.json')
+
+# Most serious first; findings are listed in this order
+LEVELS = ['urgent', 'warning', 'info']
+FORMATS = ['json', 'text', 'html']
+
+FINDINGS_HEADING = '🔎 Based on Your Values:'
+
+CARD = '<div class="suggestions"><h4>{title}</h4>{sections}<p>{note}</p></div>'
+SECTION = '<h5>{heading}</h5><ul>{items}</ul>'
+ITEM = '<li>{text}</li>'
+FINDING = '<li class="{level}">{text}</li>'
+
+
+@functools.lru_cache(maxsize=None)
+def _data():
+    with open(data_path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _covers(rule, low):
+    return (rule.get('min', -math.inf) <= low) and (low < rule.get('max', math.inf))
+
+
+# [(position in the feature vector, feature, missing value, band edges,
+# rules per band)] for the features that have rules. Band i starts at
+# edges[i - 1] (band 0 is unbounded below), so bisect_right(edges, value)
+# is the band the value falls in.
+@functools.lru_cache(maxsize=None)
+def rule_index(disease):
+    engine.check_key(disease)
+    config = _data()[disease]
+    by_feature = {}
+    for rule in config['rules']:
+        if rule['level'] not in LEVELS:
+            raise ValueError(f"Unknown level '{rule['level']}' in the {disease} rules")
+        by_feature.setdefault(rule['feature'], []).append(rule)
+
+    index = []
+    for position, feature in enumerate(engine.FEATURE_COLUMNS[disease]):
+        rules = by_feature.pop(feature, None)
+        if not rules:
+            continue
+        edges = sorted({rule[bound] for rule in rules for bound in ('min', 'max') if bound in rule})
+        bands = [tuple(rule for rule in rules if _covers(rule, low)) for low in [-math.inf] + edges]
+        index.append((position, feature, config['features'][feature].get('missing'), edges, bands))
+    if by_feature:
+        raise ValueError(f"Rules for unknown {disease} features: {', '.join(by_feature)}")
+    return index
+
+
+# Findings for one row of form or request values (a list in feature order or
+# a dict keyed by feature name), most serious first
+def match(disease, values):
+    values = engine.parse_input(disease, values)
+    features = _data()[disease]['features']
+    findings = []
+    for position, feature, missing, edges, bands in rule_index(disease):
+        value = values[position]
+        if value == missing:
+            continue
+        for rule in bands[bisect.bisect_right(edges, value)]:
+            findings.append({
+                'feature': feature,
+                'label': features[feature]['label'],
+                'value': value,
+                'unit': features[feature]['unit'],
+                'level': rule['level'],
+                'lead': rule['lead'].format(value=f'{value:g}'),
+                'text': rule['text'],
+            })
+    findings.sort(key=lambda finding: LEVELS.index(finding['level']))
+    return findings
+
+
+def _html_text(lead, rest):
+    lead, rest = html.escape(lead), html.escape(rest)
+    if not lead:
+        return rest
+    return f'<strong>{lead}</strong> {rest}' if rest else f'<strong>{lead}</strong>'
+
+
+def _plain_text(lead, rest):
+    return ' '.join(part for part in (lead, rest) if part)
+
+
+def _card(disease, high_risk):
+    return _data()[disease]['high' if high_risk else 'low']
+
+
+# (title, sections, note) of the general card, already escaped. It does not
+# depend on the values, so it is rendered once per disease and risk level.
+@functools.lru_cache(maxsize=None)
+def _card_html(disease, high_risk):
+    card = _card(disease, high_risk)
+    sections = ''.join(
+        SECTION.format(heading=html.escape(section['heading']),
+                       items=''.join(ITEM.format(text=_html_text(*item)) for item in section['items']))
+        for section in card['sections']
+    )
+    return html.escape(card['title']), sections, _html_text(*card['note'])
+
+
+class Recommendations:
+
+    def __init__(self, disease, high_risk, findings):
+        self.disease = disease
+        self.high_risk = high_risk
+        self.findings = findings
+
+    def to_dict(self):
+        card = _card(self.disease, self.high_risk)
+        return {
+            'disease': self.disease,
+            'high_risk': self.high_risk,
+            'title': card['title'],
+            'findings': self.findings,
+            'sections': [{'heading': section['heading'],
+                          'items': [_plain_text(*item) for item in section['items']]}
+                         for section in card['sections']],
+            'note': _plain_text(*card['note']),
+        }
+
+    def to_text(self):
+        card = _card(self.disease, self.high_risk)
+        sections = [(section['heading'], [_plain_text(*item) for item in section['items']])
+                    for section in card['sections']]
+        if self.findings:
+            sections.insert(0, (FINDINGS_HEADING, [_plain_text(f['lead'], f['text']) for f in self.findings]))
+        lines = [card['title']]
+        for heading, items in sections:
+            lines += ['', heading] + [f'  - {item}' for item in items]
+        lines += ['', _plain_text(*card['note'])]
+        return '\n'.join(lines)
+
+    def to_html(self):
+        title, sections, note = _card_html(self.disease, self.high_risk)
+        if self.findings:
+            items = ''.join(FINDING.format(level=finding['level'], text=_html_text(finding['lead'], finding['text']))
+                            for finding in self.findings)
+            sections = SECTION.format(heading=html.escape(FINDINGS_HEADING), items=items) + sections
+        return CARD.format(title=title, sections=sections, note=note)
+
+    # 'json' gives the dict, ready for json.dumps
+    def render(self, fmt):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown recommendations format '{fmt}', expected one of: {', '.join(FORMATS)}")
+        if fmt == 'json':
+            return self.to_dict()
+        return self.to_text() if fmt == 'text' else self.to_html()
+
+
+def recommend(disease, values, high_risk):
+    return Recommendations(disease, bool(high_risk), match(disease, values))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Print the recommendations for one row of input values.')
+    parser.add_argument('disease', choices=engine.DISEASES)
+    parser.add_argument('values', nargs='+', help='input values in feature order')
+    parser.add_argument('--high', action='store_true', help='use the high-risk card')
+    parser.add_argument('--format', choices=FORMATS, default='text')
+    args = parser.parse_args(argv)
+
+    try:
+        output = recommend(args.disease, args.values, args.high).render(args.format)
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(output, indent=2, ensure_ascii=False) if args.format == 'json' else output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,151 @@
+# Micro-batching for single-row predictions. Requests for the same key
+# (disease, model) that arrive within a short window are stacked into one
+# matrix and scored with a single call, then each caller gets its own row's
+# result back through a concurrent.futures.Future. A batch is flushed when
+# its oldest request has waited 'window' seconds or it reaches 'max_batch'
+# rows, whichever comes first.
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+RECENT_WAITS = 2048
+
+
+class MicroBatcher:
+
+    # score(key, rows) must return one result per row, in order
+    def __init__(self, score, window=0.002, max_batch=256, workers=1, name='micro-batch'):
+        if window < 0 or max_batch < 1 or workers < 1:
+            raise ValueError('window must be >= 0, max_batch and workers >= 1')
+        self.score = score
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.requests = 0
+        self.batches = 0
+        self.scored_rows = 0
+        self.errors = 0
+        self.batch_sizes = {bound: 0 for bound in BATCH_SIZE_BUCKETS + [float('inf')]}
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self._recent_waits = deque(maxlen=RECENT_WAITS)
+
+        self._threads = [threading.Thread(target=self._run, name=f'{name}-{i}', daemon=True) for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key, row):
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('MicroBatcher is closed')
+            queue = self._pending.setdefault(key, [])
+            queue.append((row, future, time.monotonic()))
+            self.requests += 1
+            # Wake a worker when a new key starts waiting or a batch fills up
+            if len(queue) == 1 or len(queue) >= self.max_batch:
+                self._cond.notify()
+        return future
+
+    # Blocking convenience wrapper around submit()
+    def predict(self, key, row, timeout=None):
+        return self.submit(key, row).result(timeout)
+
+    def _next_batch(self):
+        with self._cond:
+            while True:
+                if not self._pending:
+                    if self._closed:
+                        return None, None
+                    self._cond.wait()
+                    continue
+
+                # Serve the key whose oldest request has waited longest
+                key = min(self._pending, key=lambda k: self._pending[k][0][2])
+                queue = self._pending[key]
+                remaining = queue[0][2] + self.window - time.monotonic()
+                if len(queue) < self.max_batch and remaining > 0 and not self._closed:
+                    self._cond.wait(remaining)
+                    continue
+
+                batch = queue[:self.max_batch]
+                del queue[:self.max_batch]
+                if not queue:
+                    del self._pending[key]
+                elif len(self._threads) > 1:
+                    self._cond.notify()
+                return key, batch
+
+    def _run(self):
+        while True:
+            key, batch = self._next_batch()
+            if batch is None:
+                return
+
+            started = time.monotonic()
+            try:
+                results = self.score(key, [row for row, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f'score returned {len(results)} results for {len(batch)} rows')
+            except Exception as e:
+                self._record(batch, started, failed=True)
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            self._record(batch, started)
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def _record(self, batch, started, failed=False):
+        waits = [started - enqueued for _, _, enqueued in batch]
+        with self._cond:
+            self.batches += 1
+            self.scored_rows += len(batch)
+            self.errors += failed
+            for bound in self.batch_sizes:
+                if len(batch) <= bound:
+                    self.batch_sizes[bound] += 1
+                    break
+            self.queue_wait_total += sum(waits)
+            self.queue_wait_max = max(self.queue_wait_max, max(waits))
+            self._recent_waits.extend(waits)
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._recent_waits)
+
+            def percentile(q):
+                return waits[min(len(waits) - 1, int(q * len(waits)))] * 1000 if waits else 0.0
+
+            return {
+                'window_ms': self.window * 1000,
+                'max_batch': self.max_batch,
+                'requests': self.requests,
+                'batches': self.batches,
+                'errors': self.errors,
+                'queued': sum(len(queue) for queue in self._pending.values()),
+                'mean_batch_size': self.scored_rows / self.batches if self.batches else 0.0,
+                'batch_sizes': {('+Inf' if bound == float('inf') else bound): count
+                                for bound, count in self.batch_sizes.items()},
+                'queue_wait_mean_ms': self.queue_wait_total / (self.scored_rows or 1) * 1000,
+                'queue_wait_p50_ms': percentile(0.50),
+                'queue_wait_p99_ms': percentile(0.99),
+                'queue_wait_max_ms': self.queue_wait_max * 1000,
+            }
+
+    # Score whatever is still queued, then stop the worker threads
+    def close(self, wait=True):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
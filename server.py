@@ -0,0 +1,282 @@
+# JSON prediction service for systems that cannot drive the Streamlit form.
+# Runs on tornado (installed with streamlit); scoring happens on a thread
+# pool so the event loop keeps accepting requests, and concurrent single-row
+# requests go through the engine's micro-batching scheduler so requests for
+# the same disease/model are scored together in one matrix call.
+#
+#   python server.py --port 8000 --threads 4
+#   python server.py --port 8000 --processes 4   # score in worker processes
+#
+#   GET  /health
+#   GET  /models
+#   GET  /metrics                    Prometheus text format
+#   POST /predict/<disease>          {"model": "SVM", "features": [...] or {"age": 63, ...},
+#                                     "recommendations": "json" | "text" | "html"}   (optional)
+#   POST /predict/<disease>/batch    {"model": "SVM", "rows": [[...], {...}, ...]}
+#
+# Both prediction endpoints also accept "risk_cutoffs": [0.3, 0.7], the
+# probabilities where MODERATE and HIGH risk start (default RISK_CUTOFFS),
+# and "explain": true for per-feature contributions (see engine.explain):
+# 'explanation' for one model, 'explanations' per model for the ensemble,
+# and 'base' with 'contributions' rows for batches.
+#   GET  /static/app.<hash>.css      the app's stylesheet, for ASSET_BASE_URL (see assets.py)
+#
+# 'model' is one of the app's model names or "All Models (Ensemble)" for the
+# single-row endpoint; features follow the same order as the app's forms.
+# Features keyed by name must name every feature, with null for a blank; an
+# unknown or missing name is a 400 rather than a value scored as 0.0.
+# Responses carry the model's label ('prediction', 'risk') and its calibrated
+# probability of disease with the triage level ('probability', 'risk_level');
+# for the ensemble 'probability' is the mean of the models' probabilities and
+# 'vote_share' the share of models predicting disease.
+# With "recommendations" (true means "json") the response also carries the
+# advice the app shows for the prediction and values (see recommendations.py).
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.web
+
+import assets
+import engine
+import metrics
+import recommendations
+from process_pool import ProcessPredictor
+
+DEFAULT_MODEL = 'Logistic Regression'
+MAX_BATCH_ROWS = 100000
+
+logger = logging.getLogger('health.server')
+
+REQUEST_SECONDS = metrics.histogram('http_request_seconds', 'Prediction service request latency', ('endpoint', 'status'))
+
+
+# Content-hashed assets never change under the same name, so browsers may
+# cache them for as long as they like
+class AssetHandler(tornado.web.StaticFileHandler):
+
+    def get_cache_time(self, path, modified, mime_type):
+        return self.CACHE_MAX_AGE
+
+    def set_extra_headers(self, path):
+        self.set_header('Cache-Control', f'public, max-age={self.CACHE_MAX_AGE}, immutable')
+
+
+class JSONHandler(tornado.web.RequestHandler):
+    endpoint = 'other'
+
+    def initialize(self, executor, pool):
+        self.executor = executor
+        self.pool = pool
+
+    def write_json(self, payload, status=200):
+        self.set_status(status)
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps(payload))
+
+    def read_json(self):
+        try:
+            payload = json.loads(self.request.body or b'{}')
+        except ValueError:
+            raise ValueError('Request body must be valid JSON')
+        if not isinstance(payload, dict):
+            raise ValueError('Request body must be a JSON object')
+        return payload
+
+    def write_error(self, status_code, **kwargs):
+        self.write_json({'error': self._reason}, status_code)
+
+    def on_finish(self):
+        REQUEST_SECONDS.observe(self.request.request_time(), self.endpoint, str(self.get_status()))
+
+    async def run_scoring(self, fn):
+        try:
+            return await fn()
+        except engine.ModelLoadError as e:
+            logger.error('%s', e)
+            self.write_json({'error': 'Model could not be loaded'}, 503)
+        except (ValueError, TypeError) as e:
+            self.write_json({'error': str(e)}, 400)
+
+
+class NotFoundHandler(JSONHandler):
+
+    def prepare(self):
+        raise tornado.web.HTTPError(404)
+
+
+class MetricsHandler(JSONHandler):
+    endpoint = 'metrics'
+
+    def get(self):
+        self.set_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.finish(metrics.render())
+
+
+class HealthHandler(JSONHandler):
+    endpoint = 'health'
+
+    def get(self):
+        self.write_json({
+            'status': 'ok',
+            'loaded_models': [list(key) for key in engine.loaded_models()],
+            'scheduler': engine.get_scheduler().stats(),
+        })
+
+
+class ModelsHandler(JSONHandler):
+    endpoint = 'models'
+
+    def get(self):
+        self.write_json({
+            'diseases': {disease: {'features': engine.FEATURE_COLUMNS[disease]} for disease in engine.DISEASES},
+            'models': engine.MODEL_NAMES + [engine.ENSEMBLE],
+        })
+
+
+class PredictHandler(JSONHandler):
+    endpoint = 'predict'
+
+    async def post(self, disease):
+        async def score():
+            payload = self.read_json()
+            model_choice = payload.get('model', DEFAULT_MODEL)
+            features = payload.get('features', [])
+            cutoffs = read_cutoffs(payload)
+            advice_format = payload.get('recommendations')
+            if advice_format is True:
+                advice_format = 'json'
+            if advice_format and advice_format not in recommendations.FORMATS:
+                raise ValueError(f"'recommendations' must be one of: {', '.join(recommendations.FORMATS)}")
+
+            if model_choice == engine.ENSEMBLE:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self.executor, functools.partial(
+                    engine.predict_all, disease, features, cutoffs=cutoffs))
+                response = {'disease': disease, 'model': model_choice, 'prediction': result['majority'],
+                            'risk': risk_label(result['majority']), **result}
+            else:
+                prediction, probability = await asyncio.wrap_future(engine.submit(disease, model_choice, features))
+                response = {'disease': disease, 'model': model_choice, 'prediction': prediction,
+                            'risk': risk_label(prediction), 'probability': probability,
+                            'risk_level': engine.risk_level(probability, cutoffs)}
+
+            if payload.get('explain'):
+                loop = asyncio.get_running_loop()
+                if model_choice == engine.ENSEMBLE:
+                    response['explanations'] = await loop.run_in_executor(
+                        self.executor, engine.explain_all, disease, features)
+                else:
+                    response['explanation'] = await loop.run_in_executor(
+                        self.executor, engine.explain, disease, model_choice, features)
+            if advice_format:
+                advice = recommendations.recommend(disease, features, response['prediction'] == 1)
+                response['recommendations'] = advice.render(advice_format)
+            self.write_json(response)
+
+        await self.run_scoring(score)
+
+
+class BatchPredictHandler(JSONHandler):
+    endpoint = 'predict_batch'
+
+    async def post(self, disease):
+        async def score():
+            payload = self.read_json()
+            model_choice = payload.get('model', DEFAULT_MODEL)
+            engine.check_key(disease, model_choice)
+            cutoffs = read_cutoffs(payload)
+            rows = payload.get('rows')
+            if not isinstance(rows, list) or not rows:
+                raise ValueError("'rows' must be a non-empty list")
+            if len(rows) > MAX_BATCH_ROWS:
+                raise ValueError(f"At most {MAX_BATCH_ROWS} rows per request")
+
+            # Parsed off the event loop; large batches take a while
+            loop = asyncio.get_running_loop()
+            matrix = await loop.run_in_executor(self.executor, engine.parse_rows, disease, rows)
+            if self.pool is not None:
+                labels, probabilities = await asyncio.wrap_future(self.pool.submit_scores(disease, model_choice, matrix))
+            else:
+                labels, probabilities = await loop.run_in_executor(
+                    self.executor, engine.score_batch, disease, model_choice, matrix)
+            response = {'disease': disease, 'model': model_choice, 'predictions': labels.tolist(),
+                        'probabilities': probabilities.tolist(),
+                        'risk_levels': engine.risk_levels(probabilities, cutoffs).tolist()}
+            if payload.get('explain'):
+                base, contributions = await loop.run_in_executor(
+                    self.executor, engine.explain_batch, disease, model_choice, matrix)
+                response.update({'features': engine.FEATURE_COLUMNS[disease],
+                                 'units': engine.get_model(disease, model_choice).contribution_units,
+                                 'base': base, 'contributions': contributions.tolist()})
+            self.write_json(response)
+
+        await self.run_scoring(score)
+
+
+def risk_label(prediction):
+    return 'HIGH' if prediction == 1 else 'LOW'
+
+
+def read_cutoffs(payload):
+    cutoffs = payload.get('risk_cutoffs')
+    if cutoffs is None:
+        return None
+    if not isinstance(cutoffs, list):
+        raise ValueError("'risk_cutoffs' must be a list")
+    return engine.check_cutoffs(cutoffs)
+
+
+# With a ProcessPredictor, batch requests and the micro-batching scheduler
+# score in its worker processes; otherwise everything runs on 'threads'.
+def make_app(threads=4, pool=None):
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='scoring')
+    context = {'executor': executor, 'pool': pool}
+    diseases = '|'.join(engine.DISEASES)
+    return tornado.web.Application([
+        (r'/health', HealthHandler, context),
+        (r'/models', ModelsHandler, context),
+        (r'/metrics', MetricsHandler, context),
+        (rf'/predict/({diseases})', PredictHandler, context),
+        (rf'/predict/({diseases})/batch', BatchPredictHandler, context),
+        (r'/static/(.+)', AssetHandler, {'path': assets.build_dir}),
+    ], default_handler_class=NotFoundHandler, default_handler_args=context)
+
+
+async def serve(port, threads, processes, warm):
+    pool = None
+    if processes:
+        pool = ProcessPredictor(processes)
+        engine.set_scheduler(pool.make_scheduler(engine.BATCH_WINDOW, engine.MAX_BATCH))
+    if warm:
+        engine.warm_up(background=False)
+    assets.build()
+    make_app(threads, pool).listen(port)
+    logger.info('Prediction service listening on port %d (%s)', port,
+                f'{processes} worker processes' if processes else f'{threads} scoring threads')
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON prediction service for the diabetes and heart models.')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--threads', type=int, default=4, help='scoring threads')
+    parser.add_argument('--processes', type=int, default=0,
+                        help='score in this many worker processes sharing the mmap\'d model artifacts')
+    parser.add_argument('--no-warm-up', dest='warm', action='store_false',
+                        help='load models on first request instead of at startup')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    try:
+        asyncio.run(serve(args.port, args.threads, args.processes, args.warm))
+    except engine.ModelLoadError as e:
+        parser.exit(1, f'{e}\n')
+
+
+if __name__ == '__main__':
+    main()